@@ -37,13 +37,12 @@ def run_income_change_check(df: pd.DataFrame, start_year: int, end_year: int, co
     def year_as_int(col):
         return int(col) if isinstance(col, str) and col.isdigit() else int(col)
 
-    def change_list(row):
-        """Return list like ['2018 LM -> UM', '2022 UM -> H'] within the chosen window."""
+    def change_list(values):
+        """Return list like ['2018 LM -> UM', '2022 UM -> H'] for one row's year values (aligned with year_cols)."""
         changes = []
-        prev_val = row[year_cols[0]]
-        for c in year_cols[1:]:
+        prev_val = values[0]
+        for c, val in zip(year_cols[1:], values[1:]):
             y = year_as_int(c)
-            val = row[c]
             if val != prev_val:
                 changes.append(f"{y} {prev_val} -> {val}")
                 prev_val = val
@@ -83,11 +82,12 @@ def run_income_change_check(df: pd.DataFrame, start_year: int, end_year: int, co
     returned_to_initial = []
     not_returned_to_initial = []
 
-    for _, row in df_changed.iterrows():
-        code = str(row[code_col]).strip()
-        initial = row[year_cols[0]]
-        final = row[year_cols[-1]]
-        changes = change_list(row)
+    # plain tuples (code, *year values) instead of a Series per row
+    for code, *values in df_changed.itertuples(index=False, name=None):
+        code = str(code).strip()
+        initial = values[0]
+        final = values[-1]
+        changes = change_list(values)
 
         if final == initial:
             returned_to_initial.append((code, initial, final, changes))
@@ -7,6 +7,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from io_utils import load_table, save_df
+
 INPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/02_cleaned_data/dataset_country_analysis_final_30jan.xlsx"
 OUTPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/02_cleaned_data/dataset_country_analysis_final_30jan_clean_2015_2024.xlsx"
 SHEET_OUT = "data"
@@ -23,7 +25,7 @@ def to_na(x):
     return x
 
 def main():
-    df = pd.read_excel(INPUT_FILE, engine="openpyxl")
+    df = load_table(INPUT_FILE)
 
     required = ["country_code", "year", "gavi_supported", "vax_fd_cov", "first_year_vax_intro", "HPV_INT_DOSES"]
     missing = [c for c in required if c not in df.columns]
@@ -135,7 +137,7 @@ def main():
     # --------------------------------------------------
     DTP_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_data/dpt_vax_fd_2015_2024.xlsx"
 
-    dtp = pd.read_excel(DTP_FILE, engine="openpyxl")
+    dtp = load_table(DTP_FILE)
 
     # Basic checks
     required_dtp = ["country_code", "year", "dtp_data_source", "dtp_fd_cov"]
@@ -175,7 +177,7 @@ def main():
     # --------------------------------------------------
     DTP_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_data/dpt_vax_ld_2015_2024.xlsx"
 
-    dtp = pd.read_excel(DTP_FILE, engine="openpyxl")
+    dtp = load_table(DTP_FILE)
 
     # Basic checks
     required_dtp = ["country_code", "year", "dtp_data_source_ld", "dtp_ld_cov"]
@@ -212,10 +214,7 @@ def main():
 
     # Save
     out_path = Path(OUTPUT_FILE)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    with pd.ExcelWriter(out_path, engine="openpyxl", mode="w") as writer:
-        df.to_excel(writer, sheet_name=SHEET_OUT, index=False)
+    save_df(df, out_path, sheet_name=SHEET_OUT)
 
     print("\n✅ Saved cleaned file:", str(out_path))
 
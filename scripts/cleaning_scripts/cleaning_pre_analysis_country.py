@@ -6,6 +6,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from io_utils import load_table, save_df
+
 INPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/02_cleaned_data/dl_pro_final_dataset_country_jan29.xlsx"
 SHEET_NAME = "Sheet1"
 
@@ -32,10 +34,6 @@ RENAME_MAP = {
 }
 
 
-def load_excel(path: str, sheet_name: str) -> pd.DataFrame:
-    return pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl")
-
-
 def main():
     out_dir = Path(OUT_DIR)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -43,7 +41,7 @@ def main():
     # -----------------------------
     # Load
     # -----------------------------
-    df = load_excel(INPUT_FILE, SHEET_NAME)
+    df = load_table(INPUT_FILE, SHEET_NAME)
 
     # Normalize column names robustly
     df.columns = (
@@ -111,6 +109,10 @@ def main():
     row_complete = df[KEY_COLS].apply(
         lambda s: s.notna() & (s.astype(str) != "N/A")
     ).all(axis=1)
+    df["_row_complete"] = row_complete
+
+    # Country x year presence matrix (True if the country has a row for that year)
+    presence = pd.crosstab(df["country_code"], df["year"].astype("Int64")) > 0
 
     def country_complete_in_window(df_in: pd.DataFrame, y_min: int, y_max: int) -> pd.Series:
         """
@@ -119,20 +121,17 @@ def main():
         - all rows are complete on KEY_COLS within that window.
         Returns a Series indexed by country_code.
         """
-        sub = df_in[df_in["year"].between(y_min, y_max)].copy()
-
-        # attach row completeness
-        sub["_row_complete"] = row_complete.loc[sub.index]
+        sub = df_in[df_in["year"].between(y_min, y_max)]
 
         # must have all years present
-        years_needed = set(range(y_min, y_max + 1))
-        years_present = sub.groupby("country_code")["year"].apply(
-            lambda s: set(s.dropna().astype(int).unique())
+        has_all_years = (
+            presence.reindex(columns=range(y_min, y_max + 1), fill_value=False)
+            .all(axis=1)
         )
-        has_all_years = years_present.apply(lambda ys: years_needed.issubset(ys))
 
         # must be complete on all rows in window
         all_complete = sub.groupby("country_code")["_row_complete"].all()
+        all_complete = all_complete.reindex(has_all_years.index, fill_value=False)
 
         # align to all countries in df_in
         all_countries = pd.Index(df_in["country_code"].unique(), name="country_code")
@@ -140,17 +139,16 @@ def main():
         return out
 
     # Create flags
-    y1 = country_complete_in_window(df, 2010, 2024)
-    y2 = country_complete_in_window(df, 2015, 2024)
-    y3 = country_complete_in_window(df, 2020, 2024)
-    y4 = country_complete_in_window(df, 2022, 2024)
+    WINDOWS = [(2010, 2024), (2015, 2024), (2020, 2024), (2022, 2024)]
+    y1, y2, y3, y4 = [country_complete_in_window(df, *w) for w in WINDOWS]
 
     # 2024-only flag
-    sub_2024 = df[df["year"].eq(2024)].copy()
-    sub_2024["_row_complete"] = row_complete.loc[sub_2024.index]
+    sub_2024 = df[df["year"].eq(2024)]
     y5 = sub_2024.groupby("country_code")["_row_complete"].all()
     y5 = y5.reindex(pd.Index(df["country_code"].unique(), name="country_code"), fill_value=False)
 
+    df.drop(columns=["_row_complete"], inplace=True)
+
     # Merge flags back to df (repeat per row per country)
     flag_df = pd.DataFrame({
         "country_code": df["country_code"].unique(),
@@ -163,14 +161,13 @@ def main():
 
     # Attach gavi_supported per country_code (take first non-missing per country)
     if "gavi_supported" in df.columns:
-        gavi_map = (
-            df[["country_code", "gavi_supported"]]
-            .replace("N/A", np.nan)
-            .dropna(subset=["gavi_supported"])
+        has_gavi = df["gavi_supported"].notna() & df["gavi_supported"].ne("N/A")
+        gavi_sub = (
+            df.loc[has_gavi, ["country_code", "gavi_supported"]]
             .drop_duplicates(subset=["country_code"])
-            .set_index("country_code")["gavi_supported"]
-    )
-     
+        )
+        gavi_map = dict(zip(gavi_sub["country_code"], gavi_sub["gavi_supported"]))
+
         flag_df["gavi_supported"] = flag_df["country_code"].map(gavi_map)
     else:
         flag_df["gavi_supported"] = pd.NA
@@ -187,16 +184,18 @@ def main():
         raise ValueError("Column 'gavi_supported' not found in flag_df.")
 
     # Normalize gavi_supported into two categories
-    flag_df["_gavi_flag"] = (
-        flag_df["gavi_supported"]
-        .astype("string")
-        .str.strip()
-        .str.casefold()
-        .map({
+    # (only the few distinct labels are cleaned; rows are then mapped in one pass)
+    gavi_raw = flag_df["gavi_supported"].astype("string")
+    gavi_lut = {
+        v: {
             "supported by gavi": "supported",
             "not supported by gavi": "not_supported",
-        })
-        .fillna("unknown")
+        }.get(v.strip().casefold(), "unknown")
+        for v in gavi_raw.dropna().unique()
+    }
+    flag_df["_gavi_flag"] = pd.Categorical(
+        gavi_raw.map(gavi_lut).fillna("unknown"),
+        categories=["supported", "not_supported", "unknown"],
     )
 
     FLAG_COLS = ["y1_10_24", "y2_15_24", "y3_20_24", "y4_22_24", "y5_24"]
@@ -253,8 +252,8 @@ def main():
     out_path = out_dir / OUT_XLSX_NAME
     sheet_out = "data"
 
-    with pd.ExcelWriter(out_path, engine="openpyxl", mode="w") as writer:
-        df.to_excel(writer, sheet_name=sheet_out, index=False)
+    # "N/A" fills leave mixed-type columns -> xlsx only
+    save_df(df, out_path, sheet_name=sheet_out, sidecar=False)
 
     print("\nSaved Excel:", out_path)
 
@@ -39,8 +39,8 @@ print_dups(base, BASE_SHEET)
 print_dups(vax, SHEET_VAX)
 
 # Enforce uniqueness
-base = base.drop_duplicates("country_code", keep="first").copy()
-vax  = vax.drop_duplicates("country_code", keep="first").copy()
+base = base.drop_duplicates("country_code", keep="first", ignore_index=True)
+vax  = vax.drop_duplicates("country_code", keep="first", ignore_index=True)
 
 # =============================
 # 1) Start from base sheet
@@ -63,8 +63,11 @@ for col in ["country_name", "country_name_vax", "country_name_gavi"]:
     df[col] = df[col].astype("string").str.strip()
 
 # Fill country_name: inc → vax → gavi
-df["country_name"] = df["country_name"].fillna(df["country_name_vax"])
-df["country_name"] = df["country_name"].fillna(df["country_name_gavi"])
+df["country_name"] = (
+    df["country_name"]
+    .combine_first(df["country_name_vax"])
+    .combine_first(df["country_name_gavi"])
+)
 
 # Drop extra name columns
 df = df.drop(columns=["country_name_vax", "country_name_gavi"], errors="ignore")
@@ -78,7 +81,7 @@ if missing:
     raise ValueError(f"Missing columns in {SHEET_VAX}: {missing}")
 
 vax_add = vax[needed_cols].copy()
-df = df.merge(vax_add, on="country_code", how="left")
+df = df.merge(vax_add, on="country_code", how="left", validate="one_to_one", sort=False)
 
 # =============================
 # 3) Sort by market segment + country_code
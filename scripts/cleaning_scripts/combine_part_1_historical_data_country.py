@@ -1,4 +1,5 @@
 import pandas as pd
+from io_utils import load_table, save_df, to_int64
 
 # --------------------------------------------------
 # Paths
@@ -11,8 +12,8 @@ OUT_FILE  = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_dat
 # --------------------------------------------------
 # Load
 # --------------------------------------------------
-gavi = pd.read_excel(GAVI_FILE, engine="openpyxl")
-income = pd.read_excel(INCOME_FILE, engine="openpyxl")
+gavi = load_table(GAVI_FILE)
+income = load_table(INCOME_FILE)
 
 # --------------------------------------------------
 # Required columns
@@ -24,8 +25,8 @@ for df, name in [(gavi, "GAVI"), (income, "INCOME")]:
         raise ValueError(f"{name} file missing required columns: {missing}")
 
 # Make year comparable
-gavi["year"] = pd.to_numeric(gavi["year"], errors="coerce").astype("Int64")
-income["year"] = pd.to_numeric(income["year"], errors="coerce").astype("Int64")
+gavi["year"] = to_int64(gavi["year"])
+income["year"] = to_int64(income["year"])
 
 # --------------------------------------------------
 # Rename country_name columns to avoid collisions
@@ -71,9 +72,10 @@ print("Only in GAVI:", (merged["_merge"] == "right_only").sum())
 # Country name rule:
 # prefer INCOME name; if missing, use GAVI name
 # --------------------------------------------------
-merged["country_name"] = merged["country_name_income"]
 if "country_name_gavi" in merged.columns:
-    merged["country_name"] = merged["country_name"].fillna(merged["country_name_gavi"])
+    merged["country_name"] = merged["country_name_income"].combine_first(merged["country_name_gavi"])
+else:
+    merged["country_name"] = merged["country_name_income"]
 
 # --------------------------------------------------
 # BALANCE THE PANEL: ensure each country_code has years 2008–2025
@@ -84,17 +86,12 @@ all_years = list(range(YEAR_MIN, YEAR_MAX + 1))
 # all country codes appearing in either file (after merge)
 all_codes = merged["country_code"].dropna().unique()
 
-full_index = pd.MultiIndex.from_product(
-    [all_codes, all_years],
-    names=["country_code", "year"]
+full_frame = (
+    pd.DataFrame({"country_code": all_codes})
+    .merge(pd.DataFrame({"year": pd.array(all_years, dtype="Int64")}), how="cross")
 )
 
-merged_balanced = (
-    merged
-    .set_index(["country_code", "year"])
-    .reindex(full_index)
-    .reset_index()
-)
+merged_balanced = full_frame.merge(merged, on=["country_code", "year"], how="left")
 
 # Re-attach country_name for newly created rows:
 # (take first non-missing name per country_code)
@@ -129,7 +126,7 @@ if len(bad) > 0:
     print(bad.head(20).to_string())
 
 # Optional: sort nicely
-merged_balanced = merged_balanced.sort_values(["country_code", "year"]).reset_index(drop=True)
+merged_balanced = merged_balanced.sort_values(["country_code", "year"], kind="stable", ignore_index=True)
 
 # --------------------------------------------------
 # ADD gavi_supported column (based on gavi_spec)
@@ -149,6 +146,6 @@ merged_balanced["gavi_supported"] = gavi_nonblank.map(
 # --------------------------------------------------
 # Save
 # --------------------------------------------------
-merged_balanced.to_excel(OUT_FILE, index=False)
+save_df(merged_balanced, OUT_FILE)
 print("\nSaved merged + balanced panel file:", OUT_FILE)
 print("Final shape:", merged_balanced.shape)
\ No newline at end of file
@@ -1,6 +1,7 @@
 #this version is just to compare between the coverage_cleaned and the original data downloaded from WHO website
 
 import pandas as pd
+from io_utils import load_table, save_df, to_int64
 
 # --------------------------------------------------
 # Paths
@@ -14,9 +15,9 @@ OUT_FILE   = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_da
 # --------------------------------------------------
 # Load
 # --------------------------------------------------
-panel = pd.read_excel(PANEL_FILE, engine="openpyxl")
-cov   = pd.read_excel(COV_FILE, engine="openpyxl")
-hpv   = pd.read_excel(HPV_FILE, engine="openpyxl")
+panel = load_table(PANEL_FILE)
+cov   = load_table(COV_FILE)
+hpv   = load_table(HPV_FILE)
 
 # --------------------------------------------------
 # Required columns
@@ -38,13 +39,13 @@ for name, df, req in [
 # Normalize merge keys
 # --------------------------------------------------
 panel["country_code"] = panel["country_code"].astype(str).str.strip()
-panel["year"] = pd.to_numeric(panel["year"], errors="coerce").astype("Int64")
+panel["year"] = to_int64(panel["year"])
 
 cov["CODE"] = cov["CODE"].astype(str).str.strip()
-cov["YEAR"] = pd.to_numeric(cov["YEAR"], errors="coerce").astype("Int64")
+cov["YEAR"] = to_int64(cov["YEAR"])
 
 hpv["country_code"] = hpv["country_code"].astype(str).str.strip()
-hpv["year"] = pd.to_numeric(hpv["year"], errors="coerce").astype("Int64")
+hpv["year"] = to_int64(hpv["year"])
 
 # --------------------------------------------------
 # Drop rows with missing keys (cannot be merged meaningfully)
@@ -66,11 +67,11 @@ print("Duplicates in HPV (country_code, year):", hpv_dups)
 
 if cov_dups > 0:
     print("WARNING: coverage has duplicate (CODE, YEAR). Keeping first.")
-    cov = cov.drop_duplicates(subset=["CODE", "YEAR"], keep="first").copy()
+    cov = cov.drop_duplicates(subset=["CODE", "YEAR"], keep="first", ignore_index=True)
 
 if hpv_dups > 0:
     print("WARNING: HPV has duplicate (country_code, year). Keeping first.")
-    hpv = hpv.drop_duplicates(subset=["country_code", "year"], keep="first").copy()
+    hpv = hpv.drop_duplicates(subset=["country_code", "year"], keep="first", ignore_index=True)
 
 
 # =================================================
@@ -115,6 +116,9 @@ print("Total rows:", len(merged_all))
 
 merged_all = merged_all.drop(columns=[c for c in ["_merge"] if c in merged_all.columns])
 
+# Consolidate the blocks left behind by the chained outer merges so the
+# column-wise checks below scan contiguous arrays
+merged_all = merged_all.copy()
 
 
 # --------------------------------------------------
@@ -131,12 +135,14 @@ if not missing_cols:
         & merged_all["COVERAGE"].notna()
     )
 
-    identical = (
-        merged_all.loc[compare_mask, "ori_dat_cov"]
-        .astype(str)
-        .eq(merged_all.loc[compare_mask, "COVERAGE"].astype(str))
-        .all()
-    )
+    ori_cov = merged_all.loc[compare_mask, "ori_dat_cov"]
+    who_cov = merged_all.loc[compare_mask, "COVERAGE"]
+
+    # Compare in the native dtype; only stringify when the columns are not both numeric
+    if pd.api.types.is_numeric_dtype(ori_cov) and pd.api.types.is_numeric_dtype(who_cov):
+        identical = bool((ori_cov.to_numpy() == who_cov.to_numpy()).all())
+    else:
+        identical = bool(ori_cov.astype(str).eq(who_cov.astype(str)).all())
 
     print("\nori_dat_cov identical to COVERAGE for all comparable rows:", identical)
 
@@ -169,12 +175,12 @@ if "country_code" in cols and "country_name" in cols:
 # --------------------------------------------------
 # Optional: sort nicely
 # --------------------------------------------------
-merged_all = merged_all.sort_values(["country_code", "year"]).reset_index(drop=True)
+merged_all = merged_all.sort_values(["country_code", "year"], kind="stable", ignore_index=True)
 
 # --------------------------------------------------
 # Save
 # --------------------------------------------------
-merged_all.to_excel(OUT_FILE, index=False)
+save_df(merged_all, OUT_FILE)
 print("\nSaved merged dataset:", OUT_FILE)
 print("Final shape:", merged_all.shape)
 
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from io_utils import load_table, save_df, to_int64
+
 # --------------------------------------------------
 # Paths
 # --------------------------------------------------
@@ -11,8 +13,8 @@ OUT_FILE  = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/02_cleaned_da
 # --------------------------------------------------
 # Load
 # --------------------------------------------------
-main = pd.read_excel(MAIN_FILE, engine="openpyxl")
-meta = pd.read_excel(META_FILE, engine="openpyxl")
+main = load_table(MAIN_FILE)
+meta = load_table(META_FILE)
 
 # --------------------------------------------------
 # Required columns
@@ -34,7 +36,12 @@ meta = meta.rename(columns={"ISO_3_CODE": "country_code"})
 # --------------------------------------------------
 main["country_code"] = main["country_code"].astype(str).str.strip()
 meta["country_code"] = meta["country_code"].astype(str).str.strip()
-main["year"] = pd.to_numeric(main["year"], errors="coerce").astype("Int64")
+main["year"] = to_int64(main["year"])
+
+# Shared categorical dtype: merge + groupby run on integer codes, not strings
+code_dtype = pd.CategoricalDtype(sorted(set(main["country_code"]) | set(meta["country_code"])))
+main["country_code"] = main["country_code"].astype(code_dtype)
+meta["country_code"] = meta["country_code"].astype(code_dtype)
 
 # --------------------------------------------------
 # Keep only requested metadata columns (plus key)
@@ -52,12 +59,14 @@ missing_meta = [c for c in keep_meta_cols if c not in meta.columns]
 if missing_meta:
     raise ValueError(f"META file missing required columns: {missing_meta}")
 
-meta_small = meta[keep_meta_cols].copy()
+meta_small = meta[keep_meta_cols]
 
 # --------------------------------------------------
 # Check duplicates in metadata (should be 1 row per country)
+# keep first to avoid row explosion (merge below is then many_to_one)
 # --------------------------------------------------
-dup_meta = meta_small.duplicated(subset=["country_code"]).sum()
+meta_dedup = meta_small.drop_duplicates(subset=["country_code"], keep="first", ignore_index=True)
+dup_meta = len(meta_small) - len(meta_dedup)
 print("Duplicates in META (country_code):", dup_meta)
 
 if dup_meta > 0:
@@ -65,46 +74,49 @@ if dup_meta > 0:
     dups = meta_small[meta_small.duplicated(subset=["country_code"], keep=False)] \
         .sort_values(["country_code"])
     print(dups.head(30).to_string(index=False))
-
-    # keep first to avoid row explosion
-    meta_small = meta_small.drop_duplicates(subset=["country_code"], keep="first").copy()
     print("Keeping first occurrence per country_code in META.")
 
+meta_small = meta_dedup
+
 # --------------------------------------------------
 # Merge (left join keeps all country–year rows)
 # --------------------------------------------------
-merged = main.merge(meta_small, on="country_code", how="left", indicator=True)
+merged = main.merge(
+    meta_small,
+    on="country_code",
+    how="left",
+    sort=False,
+)
 
 print("\nMerge diagnostics:")
 print("Rows in MAIN:", len(main))
 print("Rows after merge:", len(merged))
-print("Rows with metadata:", (merged["_merge"] == "both").sum())
-print("Rows without metadata:", (merged["_merge"] == "left_only").sum())
-
-merged = merged.drop(columns=["_merge"])
+# (many_to_one left join: a row has metadata iff its key exists in META)
+n_with_meta = int(main["country_code"].isin(meta_small["country_code"]).sum())
+print("Rows with metadata:", n_with_meta)
+print("Rows without metadata:", len(merged) - n_with_meta)
 
 # --------------------------------------------------
 # Ensure metadata is constant within country across years
 # --------------------------------------------------
 meta_cols = keep_meta_cols[1:]  # exclude country_code
 
-bad_const = []
-for c in meta_cols:
-    nunq = merged.groupby("country_code")[c].nunique(dropna=True)
-    bad = nunq[nunq > 1]
-    if len(bad) > 0:
-        bad_const.append((c, bad))
+# one groupby for all metadata columns (sort only the offenders when reporting)
+nunq = merged.groupby("country_code", sort=False, observed=True)[meta_cols].nunique(dropna=True)
+violated = nunq > 1
 
-if bad_const:
+# single reduction over the country x column matrix; clean case skips all reporting
+if violated.values.any():
     print("\nWARNING: Some metadata columns vary within country across years.")
-    for c, bad in bad_const:
+    for c in violated.columns[violated.any()]:
+        bad = nunq.loc[violated[c], c].sort_index()
         print(f"\nColumn: {c} | Countries with >1 unique value: {len(bad)}")
         print(bad.head(20).to_string())
 
 # --------------------------------------------------
 # Check each country has at least 15 year-rows
 # --------------------------------------------------
-counts = merged.groupby("country_code")["year"].nunique()
+counts = merged.groupby("country_code", observed=True)["year"].nunique()
 bad_years = counts[counts < 15]
 
 print("\nCountries with < 15 year-rows:", len(bad_years))
@@ -112,11 +124,12 @@ if len(bad_years) > 0:
     print(bad_years.sort_values().head(30).to_string())
 
 # Optional: sort
-merged = merged.sort_values(["country_code", "year"]).reset_index(drop=True)
+merged = merged.sort_values(["country_code", "year"], kind="stable", ignore_index=True)
 
 # --------------------------------------------------
 # Save
 # --------------------------------------------------
-merged.to_excel(OUT_FILE, index=False)
+# (xlsx + Parquet sidecar; downstream scripts read the sidecar)
+save_df(merged, OUT_FILE)
 print("\nSaved final dataset:", OUT_FILE)
 print("Final shape:", merged.shape)
@@ -6,6 +6,11 @@
 from pathlib import Path
 import pandas as pd
 
+from io_utils import save_df
+
+# filtered frames below are modified in place; CoW keeps them cheap views
+pd.options.mode.copy_on_write = True
+
 INPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/00_raw_data/Diphtheria tetanus toxoid and pertussis (DTP) vaccination coverage 1st dose 2026-15-01 12-07 UTC.xlsx"
 OUTPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_data/dpt_vax_fd_2015_2024.xlsx"
 OUT_SHEET = "dtp_fd_2015_2024"
@@ -21,8 +26,12 @@ RENAME_MAP = {
     "COVERAGE": "dtp_fd_cov",
 }
 
+def norm_col(c) -> str:
+    return str(c).replace("\u00a0", " ").strip().upper()
+
 def main():
-    df = pd.read_excel(INPUT_FILE, engine="openpyxl")
+    # parse only the columns we keep
+    df = pd.read_excel(INPUT_FILE, engine="calamine", usecols=lambda c: norm_col(c) in KEEP_COLS)
 
     # Normalize column names
     df.columns = (
@@ -37,15 +46,15 @@ def main():
         raise ValueError(f"Missing expected columns: {missing}\nColumns seen: {df.columns.tolist()}")
 
     # Keep only needed columns
-    df = df[KEEP_COLS].copy()
+    df = df[KEEP_COLS]
 
     # Year filter
     df["YEAR"] = pd.to_numeric(df["YEAR"], errors="coerce")
-    df = df[df["YEAR"].between(YEAR_MIN, YEAR_MAX)].copy()
+    df = df[df["YEAR"].between(YEAR_MIN, YEAR_MAX)]
 
     # Keep only OFFICIAL source
     df["COVERAGE_CATEGORY"] = df["COVERAGE_CATEGORY"].astype("string").str.strip().str.upper()
-    df = df[df["COVERAGE_CATEGORY"].eq("OFFICIAL")].copy()
+    df = df[df["COVERAGE_CATEGORY"].eq("OFFICIAL")]
 
     # Clean country code
     df["CODE"] = df["CODE"].astype("string").str.strip().str.upper()
@@ -58,9 +67,7 @@ def main():
 
     # Save
     out_path = Path(OUTPUT_FILE)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(out_path, engine="openpyxl", mode="w") as writer:
-        df.to_excel(writer, sheet_name=OUT_SHEET, index=False)
+    save_df(df, out_path, sheet_name=OUT_SHEET)
 
     print("✅ Saved:", str(out_path))
     print("Rows:", len(df))
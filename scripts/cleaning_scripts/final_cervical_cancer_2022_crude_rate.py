@@ -1,5 +1,7 @@
 import pandas as pd
 
+from io_utils import load_table, save_df
+
 # --------------------------------------------------
 # File paths
 # --------------------------------------------------
@@ -8,17 +10,27 @@ CERVIX_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_d
 OUTPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/02_cleaned_data/dl_pro_final_dataset_country_jan29.xlsx"
 
 # --------------------------------------------------
-# Load master dataset
+# Load master dataset (Parquet sidecar from combine_part_3 if present)
 # --------------------------------------------------
-df_master = pd.read_excel(MASTER_FILE, engine="openpyxl")
+df_master = load_table(MASTER_FILE)
 
 print("Master data shape:", df_master.shape)
 print("Master columns:", df_master.columns.tolist())
 
 # --------------------------------------------------
-# Load cervix–uteri TSV (2022 only)
+# Load cervix–uteri TSV (2022 only) -- parse only the columns we use
 # --------------------------------------------------
-df_cerv = pd.read_csv(CERVIX_FILE, sep="\t")
+required_cols = ["Alpha3code", "Cruderate"]
+
+def norm_col(c: str) -> str:
+    return c.strip().replace(" ", "").replace("-", "")
+
+df_cerv = pd.read_csv(
+    CERVIX_FILE,
+    sep="\t",
+    usecols=lambda c: norm_col(c) in required_cols,
+    dtype={"Alpha-3 code": "string"},
+)
 
 print("Cervix data shape (raw):", df_cerv.shape)
 print("Cervix columns (raw):", df_cerv.columns.tolist())
@@ -40,7 +52,6 @@ print("Cervix columns (normalized):", df_cerv.columns.tolist())
 # --------------------------------------------------
 # Select & clean required columns
 # --------------------------------------------------
-required_cols = ["Alpha3code", "Cruderate"]
 missing = [c for c in required_cols if c not in df_cerv.columns]
 if missing:
     raise KeyError(
@@ -63,16 +74,15 @@ dup_count = df_cerv_2022["country_code"].duplicated().sum()
 print("Duplicate country_code in cervix extract:", dup_count)
 if dup_count > 0:
     # keep first occurrence (or change to an aggregation rule if needed)
-    df_cerv_2022 = df_cerv_2022.drop_duplicates(subset=["country_code"], keep="first")
+    df_cerv_2022 = df_cerv_2022.drop_duplicates(subset=["country_code"], keep="first", ignore_index=True)
 
 # --------------------------------------------------
-# Merge (LEFT JOIN: master stays intact)
+# Lookup (LEFT JOIN semantics: master stays intact; one rate per country)
 # --------------------------------------------------
-df_merged = df_master.merge(
-    df_cerv_2022,
-    on="country_code",
-    how="left"
-)
+cerv_rate = df_cerv_2022.set_index("country_code")["cerv_can_cr_rate_2022"]
+
+df_merged = df_master
+df_merged["cerv_can_cr_rate_2022"] = df_merged["country_code"].map(cerv_rate)
 
 print("Merged data shape:", df_merged.shape)
 print("New column missing values:", df_merged["cerv_can_cr_rate_2022"].isna().sum())
@@ -80,5 +90,5 @@ print("New column missing values:", df_merged["cerv_can_cr_rate_2022"].isna().su
 # --------------------------------------------------
 # Save back to Excel
 # --------------------------------------------------
-df_merged.to_excel(OUTPUT_FILE, index=False)
+save_df(df_merged, OUTPUT_FILE)
 print("✔ Merge completed successfully")
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
-import re
+
+from io_utils import save_df
 
 # --------------------------------------------------
 # File paths
@@ -23,13 +25,15 @@ target["country_name_clean"] = target["country_name"].astype(str).str.strip().st
 ref["country_name_clean"]    = ref["country_name"].astype(str).str.strip().str.lower()
 
 # --------------------------------------------------
-# Merge country_code
+# Lookup country_code (first code per cleaned name)
 # --------------------------------------------------
-merged = target.merge(
-    ref[["country_name_clean", "country_code"]],
-    on="country_name_clean",
-    how="left"
-).drop(columns=["country_name_clean"])
+code_by_name = (
+    ref.drop_duplicates(subset=["country_name_clean"])
+    .set_index("country_name_clean")["country_code"]
+)
+
+merged = target.drop(columns=["country_name_clean"])
+merged["country_code"] = target["country_name_clean"].map(code_by_name)
 
 # --------------------------------------------------
 # Sanity checks (merge)
@@ -45,7 +49,7 @@ print(unmatched)
 # --------------------------------------------------
 # Wide -> Long: gavi_2008 ... gavi_2025
 # --------------------------------------------------
-gavi_cols = [c for c in merged.columns if re.fullmatch(r"gavi_(200[8-9]|201\d|202[0-5])", str(c))]
+gavi_cols = [f"gavi_{y}" for y in range(2008, 2026) if f"gavi_{y}" in merged.columns]
 if not gavi_cols:
     raise ValueError("No columns found matching gavi_2008 ... gavi_2025. Check your column names.")
 
@@ -54,18 +58,18 @@ id_cols = [c for c in ["country_code", "country_name"] if c in merged.columns]
 if "country_code" not in id_cols:
     raise ValueError("country_code column not found after merge.")
 
-long_df = merged.melt(
-    id_vars=id_cols,
-    value_vars=gavi_cols,
-    var_name="gavi_year_col",
-    value_name="gavi_spec"
-)
+# reshape the (countries x years) block directly: one row per country-year
+years = np.array([int(c[len("gavi_"):]) for c in gavi_cols])
+n_years = len(years)
 
-long_df["year"] = long_df["gavi_year_col"].str.replace("gavi_", "", regex=False).astype(int)
-long_df = long_df.drop(columns=["gavi_year_col"])
+long_df = pd.DataFrame({
+    **{c: np.repeat(merged[c].to_numpy(), n_years) for c in id_cols},
+    "gavi_spec": merged[gavi_cols].to_numpy().ravel(),
+    "year": np.tile(years, len(merged)),
+})
 
 # Optional: sort nicely
-long_df = long_df.sort_values(["country_code", "year"]).reset_index(drop=True)
+long_df = long_df.sort_values(["country_code", "year"], kind="stable", ignore_index=True)
 
 # --------------------------------------------------
 # Sanity checks (reshape)
@@ -78,5 +82,5 @@ print("Missing gavi_spec:", long_df["gavi_spec"].isna().sum())
 # --------------------------------------------------
 # Save ONE final output (long format)
 # --------------------------------------------------
-long_df.to_excel(OUTPUT_FILE, index=False)
+save_df(long_df, OUTPUT_FILE)
 print("\nSaved final long dataset to:", OUTPUT_FILE)
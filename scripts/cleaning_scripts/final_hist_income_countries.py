@@ -8,7 +8,11 @@ Create intermediate WB historical income file (LONG format, 2008–2024)
 - Keeps income_class only if in {H, L, LM, UM}, else blank
 """
 
-from openpyxl import load_workbook, Workbook
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from io_utils import save_df
 
 # ==================================================
 # PATHS
@@ -35,58 +39,54 @@ VALID_INCOME = {"H", "L", "LM", "UM"}
 # ==================================================
 # LOAD RAW WORKBOOK
 # ==================================================
-wb_in = load_workbook(RAW_INPUT_FILE, data_only=True)
+wb_in = load_workbook(RAW_INPUT_FILE, data_only=True, read_only=True)
 if SHEET_NAME not in wb_in.sheetnames:
     raise ValueError(f"Sheet '{SHEET_NAME}' not found. Available: {wb_in.sheetnames}")
 ws_in = wb_in[SHEET_NAME]
 
 # ==================================================
-# CREATE OUTPUT (LONG FORMAT)
+# COLLECT RAW ROWS
 # ==================================================
-wb_out = Workbook()
-ws_out = wb_out.active
-ws_out.title = "long_2008_2024"
-
-# headers
-ws_out.append(["country_code", "country_name", "year", "income_class"])
-
-out_row = 2
+codes, names, year_block = [], [], []
 
-for r in range(INPUT_START_ROW, ws_in.max_row + 1):
-    country_code = ws_in.cell(row=r, column=COL_COUNTRY_CODE).value
+# stream rows (read_only) instead of random cell access; max_col pads short rows
+for row in ws_in.iter_rows(
+    min_row=INPUT_START_ROW,
+    max_col=COL_YEAR_START + N_YEARS - 1,
+    values_only=True,
+):
+    country_code = row[COL_COUNTRY_CODE - 1]
 
     if country_code in (None, ""):
         continue
 
-    country_name = ws_in.cell(row=r, column=COL_COUNTRY_NAME).value
+    codes.append(country_code)
+    names.append(row[COL_COUNTRY_NAME - 1])
+    year_block.append(row[COL_YEAR_START - 1 : COL_YEAR_START - 1 + N_YEARS])
 
-    for i in range(N_YEARS):
-        year = START_YEAR + i
-        raw_val = ws_in.cell(
-            row=r,
-            column=COL_YEAR_START + i
-        ).value
+    if country_code == STOP_CODE:
+        break
 
-        # --- sanitize income class ---
-        if raw_val is None:
-            income_val = None
-        else:
-            val = str(raw_val).strip().upper()
-            income_val = val if val in VALID_INCOME else None
+wb_in.close()
 
-        ws_out.cell(row=out_row, column=1).value = country_code
-        ws_out.cell(row=out_row, column=2).value = country_name
-        ws_out.cell(row=out_row, column=3).value = year
-        ws_out.cell(row=out_row, column=4).value = income_val
+# ==================================================
+# BUILD OUTPUT (LONG FORMAT)
+# ==================================================
+years = np.arange(START_YEAR, START_YEAR + N_YEARS)
 
-        out_row += 1
+long_df = pd.DataFrame({
+    "country_code": np.repeat(np.array(codes, dtype=object), N_YEARS),
+    "country_name": np.repeat(np.array(names, dtype=object), N_YEARS),
+    "year": np.tile(years, len(codes)),
+    "income_class": np.array(year_block, dtype=object).ravel(),
+})
 
-    if country_code == STOP_CODE:
-        break
+# --- sanitize income class ---
+income = long_df["income_class"].astype("string").str.strip().str.upper()
+long_df["income_class"] = income.where(income.isin(VALID_INCOME))
 
-wb_out.save(INTERM_OUTPUT_FILE)
-wb_in.close()
+save_df(long_df, INTERM_OUTPUT_FILE, sheet_name="long_2008_2024")
 
 print("Saved LONG-format intermediate file:", INTERM_OUTPUT_FILE)
-print("Rows written:", out_row - 2)
+print("Rows written:", len(long_df))
 print("Years:", START_YEAR, "-", START_YEAR + N_YEARS - 1)
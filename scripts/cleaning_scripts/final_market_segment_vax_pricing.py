@@ -1,5 +1,9 @@
+import re
+import numpy as np
 import pandas as pd
 
+from io_utils import load_table, save_df, to_int64
+
 # --------------------------------------------------
 # Paths
 # --------------------------------------------------
@@ -9,7 +13,7 @@ OUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_data
 # --------------------------------------------------
 # Load
 # --------------------------------------------------
-df = pd.read_excel(IN_FILE, engine="openpyxl")
+df = load_table(IN_FILE)
 
 # --------------------------------------------------
 # Required columns
@@ -20,16 +24,14 @@ if missing:
     raise ValueError(f"Missing required columns in combined file: {missing}")
 
 # Make year numeric
-df["year"] = pd.to_numeric(df["year"], errors="coerce").astype("Int64")
+df["year"] = to_int64(df["year"])
+
+# country_code as categorical (groupby on integer codes)
+df["country_code"] = df["country_code"].astype("category")
 
 # --------------------------------------------------
 # Helpers
 # --------------------------------------------------
-def norm(x):
-    if pd.isna(x):
-        return ""
-    return str(x).strip().casefold()
-
 # Gavi statuses (from eligibility data) that imply "in Gavi support/transition"
 IN_GAVI_KEYWORDS = [
     "poorest",
@@ -48,33 +50,33 @@ FORMER_GAVI_KEYWORDS = [
     "fully self-financing",
 ]
 
-def assign_market_segment(row) -> str:
-    gavi_val = norm(row.get("gavi_spec"))
-    inc = row.get("income_class")
-    inc = str(inc).strip().upper() if pd.notna(inc) else ""
-
-    # 1) Use gavi_spec when available (country-year specific)
-    if gavi_val:
-        if any(k in gavi_val for k in FORMER_GAVI_KEYWORDS):
-            return "gavi731"
-        if any(k in gavi_val for k in IN_GAVI_KEYWORDS):
-            return "Gavi73"
-        # If it has some gavi label but doesn't match our keyword list,
-        # still treat as "in Gavi list" rather than "not in gavi"
-        return "Gavi73"
-
-    # 2) If no gavi_spec: treat as NOT in gavi (fallback to income_class)
-    if inc == "H":
-        return "HIC"
-    elif inc in {"LM", "UM"}:
-        return "MICs7"
-    else:
-        return "NC"
+# One alternation regex per keyword list -> a single scan per string
+IN_GAVI_RE = re.compile("|".join(map(re.escape, IN_GAVI_KEYWORDS)))
+FORMER_GAVI_RE = re.compile("|".join(map(re.escape, FORMER_GAVI_KEYWORDS)))
 
 # --------------------------------------------------
-# Assign segment
+# Assign segment (vectorized)
 # --------------------------------------------------
-df["market_segment"] = df.apply(assign_market_segment, axis=1)
+gavi_val = df["gavi_spec"].astype("string").str.strip().str.casefold().fillna("")
+inc = df["income_class"].astype("string").str.strip().str.upper().fillna("")
+
+has_gavi = gavi_val.ne("")
+
+df["market_segment"] = np.select(
+    [
+        # 1) Use gavi_spec when available (country-year specific)
+        has_gavi & gavi_val.str.contains(FORMER_GAVI_RE),
+        has_gavi & gavi_val.str.contains(IN_GAVI_RE),
+        # If it has some gavi label but doesn't match our keyword list,
+        # still treat as "in Gavi list" rather than "not in gavi"
+        has_gavi,
+        # 2) If no gavi_spec: treat as NOT in gavi (fallback to income_class)
+        inc.eq("H"),
+        inc.isin(["LM", "UM"]),
+    ],
+    ["gavi731", "Gavi73", "Gavi73", "HIC", "MICs7"],
+    default="NC",
+)
 
 # --------------------------------------------------
 # Quick checks
@@ -85,7 +87,7 @@ print("Market segment counts:\n", df["market_segment"].value_counts(dropna=False
 YEAR_MIN, YEAR_MAX = 2008, 2025
 expected_n = YEAR_MAX - YEAR_MIN + 1
 
-counts = df.groupby("country_code")["year"].nunique()
+counts = df.groupby("country_code", observed=True)["year"].nunique()
 bad = counts[counts != expected_n]
 
 print("\nExpected years per country:", expected_n)
@@ -96,6 +98,6 @@ if len(bad) > 0:
 # --------------------------------------------------
 # Save
 # --------------------------------------------------
-df.to_excel(OUT_FILE, index=False)
+save_df(df, OUT_FILE)
 print("\nSaved:", OUT_FILE)
 print("Final shape:", df.shape)
@@ -1,29 +1,61 @@
+import re
+import json
+from pathlib import Path
+from itertools import chain
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-import pdfplumber
-import pandas as pd
+import pypdfium2 as pdfium
+
+from io_utils import save_df
 
 PDF_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/00_raw_data/gavi_eligibility_country.pdf"
 OUT_EXCEL = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_data/gavi_eligibility_country.xlsx"
 
-rows = []
+# The PDF table has no ruling lines, so table detection finds nothing;
+# each text line is "<country> <year> [<group>]" (group can be blank)
+ROW_RE = re.compile(r"^(.+?)\s+(\d{4})(?:\s+(.+))?$")
+
+# bump when the PDF row parsing/cleaning below changes (invalidates the cache)
+PDF_PARSER_VERSION = 1
+
+# The sidecar save_df writes next to OUT_EXCEL doubles as the parse cache:
+# reuse it only while the stored signature matches the PDF and the parser
+PDF_CACHE = Path(OUT_EXCEL).with_suffix(".parquet")
+PDF_CACHE_SIG = Path(OUT_EXCEL).with_suffix(".sig.json")
+
+pdf_stat = Path(PDF_FILE).stat()
+pdf_sig = [PDF_FILE, pdf_stat.st_mtime_ns, pdf_stat.st_size, PDF_PARSER_VERSION, ROW_RE.pattern]
+
+if (
+    PDF_CACHE.exists() and Path(OUT_EXCEL).exists() and PDF_CACHE_SIG.exists()
+    and json.loads(PDF_CACHE_SIG.read_text()) == pdf_sig
+):
+    df = pd.read_parquet(PDF_CACHE)
+    print("Loaded cached PDF table:", PDF_CACHE)
+else:
+    pdf = pdfium.PdfDocument(PDF_FILE)
+    lines = chain.from_iterable(
+        page.get_textpage().get_text_bounded().splitlines() for page in pdf
+    )
+    # non-matching lines (the header) drop out
+    rows = [m.groups() for m in map(ROW_RE.match, map(str.strip, lines)) if m]
+    pdf.close()
 
-with pdfplumber.open(PDF_FILE) as pdf:
-    for page in pdf.pages:
-        tables = page.extract_tables()
-        for table in tables:
-            for row in table:
-                rows.append(row)
+    df = pd.DataFrame(rows, columns=["country", "year", "gavi_eligibility_group"])
 
-df = pd.DataFrame(rows, columns=["country", "year", "gavi_eligibility_group"])
+    # Clean
+    df = df.dropna(subset=["country", "year"])
+    df["year"] = pd.to_numeric(df["year"], errors="coerce")
 
-# Clean
-df = df.dropna(subset=["country", "year"])
-df["year"] = pd.to_numeric(df["year"], errors="coerce")
+    save_df(df, OUT_EXCEL)
+    print("Saved:", OUT_EXCEL)
 
-df.to_excel(OUT_EXCEL, index=False)
+    # signature only when the sidecar was written (save_df skips it otherwise)
+    if PDF_CACHE.exists():
+        PDF_CACHE_SIG.write_text(json.dumps(pdf_sig))
+    else:
+        PDF_CACHE_SIG.unlink(missing_ok=True)
 
-print("Saved:", OUT_EXCEL)
 print(df.head())
 
 # --------------------------------------------------
@@ -39,10 +71,13 @@ OUTPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_d
 MIC_FILL_START_YEAR = 2022
 MIC_FILL_END_YEAR   = 2025
 
+# print the full before/after MIC tables (otherwise only their first rows)
+VERBOSE = False
+
 # --------------------------------------------------
 # Step 1: Build WIDE table from INPUT_1
 # --------------------------------------------------
-df = pd.read_excel(INPUT_1, sheet_name=SHEET_1, engine="openpyxl")
+df = pd.read_excel(INPUT_1, sheet_name=SHEET_1, engine="calamine")
 
 df = df[["Country", "Year", "Gavi eligibility group"]].rename(columns={
     "Country": "country_name",
@@ -61,13 +96,15 @@ df["year"] = df["year"].astype(int)
 df = df.drop_duplicates(subset=["country_name", "year"], keep="first")
 
 wide = df.pivot(index="country_name", columns="year", values="gavi_eligibility_group")
-wide.columns = [f"gavi_{y}" for y in wide.columns]
+# keep the int years from the pivot; later sorts use these, not the labels
+year_ints = sorted(wide.columns.tolist())
+wide.columns = [f"gavi_{y}" for y in year_ints]
 wide = wide.reset_index()
 
 # --------------------------------------------------
 # Step 2: Load MIC input (INPUT_2)
 # --------------------------------------------------
-mic = pd.read_excel(INPUT_2, engine="openpyxl")
+mic = pd.read_excel(INPUT_2, engine="calamine")
 mic = mic[["country_name", "gavi_mic_status"]].copy()
 mic["country_name"] = mic["country_name"].astype(str).str.strip()
 mic["gavi_mic_status"] = mic["gavi_mic_status"].astype(str).str.strip()
@@ -76,9 +113,10 @@ mic["gavi_mic_status"] = mic["gavi_mic_status"].astype(str).str.strip()
 # Step 3: Ensure wide has columns gavi_2022 ... gavi_2025
 # --------------------------------------------------
 for y in range(MIC_FILL_START_YEAR, MIC_FILL_END_YEAR + 1):
-    col = f"gavi_{y}"
-    if col not in wide.columns:
-        wide[col] = pd.NA
+    if y not in year_ints:
+        wide[f"gavi_{y}"] = pd.NA
+        year_ints.append(y)
+year_ints.sort()
 
 # --------------------------------------------------
 # Step 4: PRINT CHECKS FIRST (before overwriting)
@@ -95,8 +133,10 @@ print(f"Already in wide data: {len(existing_in_mic)}")
 print(f"NEW (not in wide data): {len(new_in_mic)}")
 
 print("\nCountries already in wide data (and also in MIC list):")
-for c in existing_in_mic:
-    print(c)
+print("\n".join(existing_in_mic))
+
+print("\nMIC countries NOT in wide data (will be added):")
+print("\n".join(new_in_mic))
 
 years_to_show = [2022, 2023, 2024, 2025]
 cols_to_show = ["country_name"] + [f"gavi_{y}" for y in years_to_show]
@@ -106,41 +146,18 @@ df_existing_mic_before = (
     wide.loc[wide["country_name"].isin(existing_in_mic), cols_to_show]
     .sort_values("country_name")
 )
-print(df_existing_mic_before.to_string(index=False))
-
-# --------------------------------------------------
-# EXTRA CHECK: counts of MIC countries
-# (BEFORE overwriting any values)
-# --------------------------------------------------
-wide_names = set(wide["country_name"])
-mic_names = set(mic["country_name"])
-
-existing_in_wide = sorted(mic_names & wide_names)
-new_not_in_wide  = sorted(mic_names - wide_names)
-
-print("\n=== PRE-OVERWRITE MIC COVERAGE CHECK ===")
-print(f"Total MIC countries           : {len(mic_names)}")
-print(f"MIC countries already in wide : {len(existing_in_wide)}")
-print(f"MIC countries NOT in wide     : {len(new_not_in_wide)}")
-
-print("\nMIC countries already in wide data:")
-for c in existing_in_wide:
-    print(c)
-
-print("\nMIC countries NOT in wide data (will be added):")
-for c in new_not_in_wide:
-    print(c)
-
+print((df_existing_mic_before if VERBOSE else df_existing_mic_before.head()).to_string(index=False))
 
 # --------------------------------------------------
 # Step 5: Ensure ALL MIC countries exist in wide (append missing ones)
 # --------------------------------------------------
 if new_in_mic:
-    add_rows = pd.DataFrame({"country_name": new_in_mic})
-    # create empty year cols (only 2022–2025 are needed for MIC overwrite)
-    for y in range(MIC_FILL_START_YEAR, MIC_FILL_END_YEAR + 1):
-        add_rows[f"gavi_{y}"] = pd.NA
-    wide = pd.concat([wide, add_rows], ignore_index=True)
+    # one reindex over the union (new rows come in empty; MIC years filled in Step 6)
+    wide = (
+        wide.set_index("country_name")
+        .reindex(sorted(wide_names | mic_names))
+        .reset_index()
+    )
 
 # --------------------------------------------------
 # Step 6: Overwrite gavi_2022–gavi_2025 with MIC status for ALL MIC countries
@@ -148,19 +165,18 @@ if new_in_mic:
 mic_map = dict(zip(mic["country_name"], mic["gavi_mic_status"]))
 
 mic_val = wide["country_name"].map(mic_map)
+mask = mic_val.notna().to_numpy()  # only MIC countries
 
-for y in range(MIC_FILL_START_YEAR, MIC_FILL_END_YEAR + 1):
-    col = f"gavi_{y}"
-    mask = mic_val.notna()  # only MIC countries
-    wide.loc[mask, col] = mic_val[mask].values
+# one 2-D write: the MIC status column broadcast across all fill years
+mic_year_cols = [f"gavi_{y}" for y in range(MIC_FILL_START_YEAR, MIC_FILL_END_YEAR + 1)]
+wide.loc[mask, mic_year_cols] = np.repeat(
+    mic_val[mask].to_numpy()[:, None], len(mic_year_cols), axis=1
+)
 
 # --------------------------------------------------
 # Final formatting: order columns
 # --------------------------------------------------
-year_cols_sorted = sorted(
-    [c for c in wide.columns if c.startswith("gavi_")],
-    key=lambda x: int(x.split("_")[1])
-)
+year_cols_sorted = [f"gavi_{y}" for y in year_ints]
 
 wide = wide[["country_name"] + year_cols_sorted].copy()
 wide = wide.sort_values("country_name").reset_index(drop=True)
@@ -168,8 +184,7 @@ wide = wide.sort_values("country_name").reset_index(drop=True)
 # --------------------------------------------------
 # Save
 # --------------------------------------------------
-with pd.ExcelWriter(OUTPUT_FILE, engine="openpyxl") as writer:
-    wide.to_excel(writer, sheet_name="gavi_wide_plus_mic", index=False)
+save_df(wide, OUTPUT_FILE, sheet_name="gavi_wide_plus_mic")
 
 print("\nSaved:", OUTPUT_FILE)
 print("Countries:", wide["country_name"].nunique())
@@ -184,7 +199,7 @@ df_mic_after = (
     wide.loc[wide["country_name"].isin(sorted(mic_names)), ["country_name"] + [f"gavi_{y}" for y in years_to_show]]
     .sort_values("country_name")
 )
-print(df_mic_after.to_string(index=False))
+print((df_mic_after if VERBOSE else df_mic_after.head()).to_string(index=False))
 
 
 # --------------------------------------------------
@@ -200,10 +215,7 @@ SHEET_VAX = "hpv_vax_2024"
 
 # 1) Base: from already-built `wide`
 df_2024 = wide[["country_name", "gavi_2024"]].copy()
-df_2024["country_name"] = df_2024["country_name"].astype("string").str.strip()
-
-# Create empty country_code
-df_2024["country_code"] = pd.NA
+df_2024["country_name"] = df_2024["country_name"].astype("string[pyarrow]").str.strip()
 
 # 2) Prefill tricky codes (provided list)
 prefill_map = {
@@ -222,21 +234,17 @@ prefill_map = {
     "Yemen": "YEM",
 }
 
-df_2024.loc[df_2024["country_name"].isin(prefill_map.keys()), "country_code"] = (
-    df_2024["country_name"].map(prefill_map)
-)
-
 # 3) Load reference sheets for mapping
-inc = pd.read_excel(FINAL_FILE, sheet_name=SHEET_INC, engine="openpyxl")
-vax = pd.read_excel(FINAL_FILE, sheet_name=SHEET_VAX, engine="openpyxl")
+inc = pd.read_excel(FINAL_FILE, sheet_name=SHEET_INC, engine="calamine")
+vax = pd.read_excel(FINAL_FILE, sheet_name=SHEET_VAX, engine="calamine")
 
 def make_name_to_code(df, label):
-    tmp = df[["country_code", "country_name"]].copy()
-    tmp["country_code"] = tmp["country_code"].astype("string").str.strip().str.upper()
-    tmp["country_name"] = tmp["country_name"].astype("string").str.strip()
+    # dedupe raw pairs first so only ~200 distinct strings get normalised
+    tmp = df[["country_code", "country_name"]].dropna().drop_duplicates()
+    tmp["country_code"] = tmp["country_code"].astype("string[pyarrow]").str.strip().str.upper()
+    tmp["country_name"] = tmp["country_name"].astype("string[pyarrow]").str.strip()
 
     # keep first code per name (name→code may not be unique; follow "keep first" convention)
-    tmp = tmp.dropna(subset=["country_name", "country_code"])
     tmp = tmp.drop_duplicates(subset=["country_name"], keep="first")
 
     print(f"\n=== Mapping table size: {label} ===")
@@ -248,15 +256,18 @@ def make_name_to_code(df, label):
 inc_map = make_name_to_code(inc, "income_class_2024")
 vax_map = make_name_to_code(vax, "hpv_vax_2024")
 
-# 4) Map remaining: INCOME first
-mask_need = df_2024["country_code"].isna()
-df_2024.loc[mask_need, "country_code"] = df_2024.loc[mask_need, "country_name"].map(inc_map)
+# 4) Resolve each unique name once: prefill, then INCOME, then VAX
+name_cat = df_2024["country_name"].astype("category")
+names = name_cat.cat.categories.to_series(index=name_cat.cat.categories)
+
+code_by_income = names.map(prefill_map).fillna(names.map(inc_map))
+code_by_vax = code_by_income.fillna(names.map(vax_map))
 
-mapped_by_income = int(df_2024["country_code"].notna().sum())
+# 5) Broadcast back to rows
+row_names = name_cat.to_numpy()
+df_2024["country_code"] = code_by_vax.reindex(row_names).to_numpy()
 
-# 5) Map still-unmatched: VAX second
-mask_need = df_2024["country_code"].isna()
-df_2024.loc[mask_need, "country_code"] = df_2024.loc[mask_need, "country_name"].map(vax_map)
+mapped_by_income = int(code_by_income.reindex(row_names).notna().sum())
 
 # 6) Print diagnostics BEFORE writing anything
 total = len(df_2024)
@@ -279,21 +290,15 @@ if unmapped > 0:
     )
 
 # Optional: enforce format
-df_2024["country_code"] = df_2024["country_code"].astype("string").str.upper().str.strip()
+df_2024["country_code"] = df_2024["country_code"].astype("string[pyarrow]").str.upper().str.strip()
 
 # Reorder columns nicely
 df_2024 = df_2024[["country_code", "country_name", "gavi_2024"]].sort_values(
     ["country_code", "country_name"], na_position="last"
 ).reset_index(drop=True)
 
-# 7) Write the sheet (replace if exists)
-wb = load_workbook(FINAL_FILE)
-if FINAL_SHEET in wb.sheetnames:
-    wb.remove(wb[FINAL_SHEET])
-    wb.save(FINAL_FILE)
-wb.close()
-
-with pd.ExcelWriter(FINAL_FILE, engine="openpyxl", mode="a") as writer:
+# 7) Write the sheet (replace if exists) -- one load + one save of the workbook
+with pd.ExcelWriter(FINAL_FILE, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
     df_2024.to_excel(writer, sheet_name=FINAL_SHEET, index=False)
 
 print("\nSaved 2024 Gavi status (with country_code) to:")
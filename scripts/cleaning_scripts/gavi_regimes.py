@@ -14,6 +14,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from io_utils import load_table, save_df
+
 # -----------------------------
 # Paths
 # -----------------------------
@@ -32,7 +34,7 @@ OUT_XLSX = OUT_DIR / "dataset_country_analysis_with_gavi_regimes.xlsx"
 # -----------------------------
 # Load
 # -----------------------------
-df = pd.read_excel(INPUT_XLSX, engine="openpyxl")
+df = load_table(INPUT_XLSX)
 
 # -----------------------------
 # Basic cleaning
@@ -40,7 +42,7 @@ df = pd.read_excel(INPUT_XLSX, engine="openpyxl")
 df["year"] = pd.to_numeric(df["year"], errors="coerce").astype("Int64")
 
 # income_class in file: H / UM / LM / L
-df["income_class"] = df["income_class"].astype("string").str.strip().str.upper()
+df["income_class"] = df["income_class"].astype("string[pyarrow]").str.strip().str.upper()
 
 # HPV coverage (FIRST-DOSE)
 df["vax_fd_cov"] = pd.to_numeric(df["vax_fd_cov"], errors="coerce")
@@ -49,8 +51,8 @@ df["vax_fd_cov"] = pd.to_numeric(df["vax_fd_cov"], errors="coerce")
 df = df.dropna(subset=["vax_fd_cov"]).copy()
 
 # Normalize gavi_supported + gavi_spec
-df["gavi_supported"] = df["gavi_supported"].astype("string").str.strip().str.lower()
-df["gavi_spec"] = df["gavi_spec"].astype("string").str.strip().str.lower()
+df["gavi_supported"] = df["gavi_supported"].astype("string[pyarrow]").str.strip().str.lower()
+df["gavi_spec"] = df["gavi_spec"].astype("string[pyarrow]").str.strip().str.lower()
 
 # Optional: nice labels for income classes (useful for plots)
 income_map = {"L": "LIC", "LM": "LMIC", "UM": "UMIC", "H": "HIC"}
@@ -69,17 +71,15 @@ df["income_class_lbl"] = df["income_class"].map(income_map).fillna(df["income_cl
 
 MIC_TAGS = {"mic_former_gavi", "mic_never_gavi"}
 
-def classify_regime(gs: str, spec: str) -> str:
-    if gs == "not supported by gavi":
-        return "Never Gavi"
-    # supported by gavi
-    if spec in MIC_TAGS:
-        return "MICs approach / post-Gavi"
-    return "Classic Gavi"
-
-df["gavi_regime_it"] = [
-    classify_regime(gs, spec) for gs, spec in zip(df["gavi_supported"], df["gavi_spec"])
+# first matching condition wins (same order as the definitions above)
+regime_conds = [
+    df["gavi_supported"].eq("not supported by gavi").fillna(False).to_numpy(bool),
+    df["gavi_spec"].isin(MIC_TAGS).to_numpy(bool),
 ]
+df["gavi_regime_it"] = pd.Categorical(
+    np.select(regime_conds, ["Never Gavi", "MICs approach / post-Gavi"], default="Classic Gavi"),
+    categories=["Classic Gavi", "MICs approach / post-Gavi", "Never Gavi"],
+)
 
 # -----------------------------
 # 2) Build country-level "ever classic Gavi" (time-invariant)
@@ -90,21 +90,21 @@ if "country_code" not in df.columns:
 classic_by_country = (
     df.loc[df["gavi_regime_it"] == "Classic Gavi", "country_code"]
     .dropna()
-    .astype("string")
+    .astype("string[pyarrow]")
     .unique()
 )
 
-df["ever_classic_gavi"] = df["country_code"].astype("string").isin(classic_by_country).astype(int)
+df["ever_classic_gavi"] = df["country_code"].astype("string[pyarrow]").isin(classic_by_country).astype(int)
 
 # Optional: also define "ever_supported_by_gavi" (includes MIC approach)
 supported_by_country = (
     df.loc[df["gavi_supported"] != "not supported by gavi", "country_code"]
     .dropna()
-    .astype("string")
+    .astype("string[pyarrow]")
     .unique()
 )
 
-df["ever_supported_by_gavi"] = df["country_code"].astype("string").isin(supported_by_country).astype(int)
+df["ever_supported_by_gavi"] = df["country_code"].astype("string[pyarrow]").isin(supported_by_country).astype(int)
 
 # -----------------------------
 # 3) Convenience: HIC flag (time-varying)
@@ -126,18 +126,17 @@ print("\n=== Basic counts (rows) by Gavi regime (kept sample) ===")
 print(df["gavi_regime_it"].value_counts(dropna=False).to_string())
 
 print("\n=== Unique countries by Gavi regime (ever) (kept sample) ===")
-country_regime = (
-    df[["country_code", "gavi_regime_it"]]
-    .dropna()
-    .drop_duplicates()
-)
-print(country_regime.groupby("gavi_regime_it")["country_code"].nunique().to_string())
+# nunique already ignores repeats and missing codes; no pair dedup needed
+print(df.groupby("gavi_regime_it", observed=True)["country_code"].nunique().to_string())
+
+# one row per country, reused by the "ever" counts below
+country_level = df.drop_duplicates("country_code")
 
 print("\n=== How many countries are ever classic Gavi? (kept sample) ===")
-print(int(df.drop_duplicates("country_code")["ever_classic_gavi"].sum()))
+print(int(country_level["ever_classic_gavi"].sum()))
 
 print("\n=== How many countries are ever supported by Gavi (any support)? (kept sample) ===")
-print(int(df.drop_duplicates("country_code")["ever_supported_by_gavi"].sum()))
+print(int(country_level["ever_supported_by_gavi"].sum()))
 
 # -----------------------------
 # 5) Detect transitions (regime changes) over time
@@ -160,10 +159,13 @@ print("\nTotal countries with >=1 transition:",
       int((transitions >= 1).sum()))
 
 # Optional: focus on 2021 -> 2022 transitions specifically
+# direct reshape of the two-year slice (first regime per country-year)
 pivot_2122 = (
-    df[df["year"].isin([2021, 2022])]
-    .dropna(subset=["country_code", "year"])
-    .pivot_table(index="country_code", columns="year", values="gavi_regime_it", aggfunc="first")
+    df.loc[df["year"].isin([2021, 2022]), ["country_code", "year", "gavi_regime_it"]]
+    .dropna()
+    .drop_duplicates(["country_code", "year"])
+    .set_index(["country_code", "year"])["gavi_regime_it"]
+    .unstack("year")
 )
 
 switch_2122 = pivot_2122.dropna()
@@ -173,10 +175,11 @@ print("\n=== Regime switchers between 2021 and 2022 (kept sample) ===")
 print("Count:", switch_2122.shape[0])
 
 if switch_2122.shape[0] > 0:
+    # one name per code in the panel, so the first row is the name
     name_map = (
         df.dropna(subset=["country_code", "country_name"])
-        .groupby("country_code")["country_name"]
-        .agg(lambda s: s.mode().iloc[0] if not s.mode().empty else s.iloc[0])
+        .drop_duplicates("country_code")
+        .set_index("country_code")["country_name"]
     )
     out = switch_2122.join(name_map, how="left")
     out = out.rename(columns={2021: "regime_2021", 2022: "regime_2022"})
@@ -189,5 +192,5 @@ if switch_2122.shape[0] > 0:
 # -----------------------------
 # 6) Save
 # -----------------------------
-df.to_excel(OUT_XLSX, index=False, engine="openpyxl")
+save_df(df, OUT_XLSX)
 print(f"\nSaved: {OUT_XLSX}")
@@ -13,6 +13,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from io_utils import load_table, save_df
+
 # -----------------------------
 # Paths
 # -----------------------------
@@ -29,7 +31,7 @@ OUT_XLSX = Path(
 # -----------------------------
 # Load
 # -----------------------------
-df = pd.read_excel(INPUT_XLSX, engine="openpyxl")
+df = load_table(INPUT_XLSX)
 
 # Safety checks
 required_cols = {
@@ -49,29 +51,35 @@ if missing:
 # We classify countries based on their EVER status
 # and whether they EVER appear as MICs approach / post-Gavi
 
-def classify_trajectory(sub: pd.DataFrame) -> str:
-    regimes = set(sub["gavi_regime_it"].dropna().unique().tolist())
-
-    ever_classic = int(sub["ever_classic_gavi"].iloc[0])
-    ever_supported = int(sub["ever_supported_by_gavi"].iloc[0])
-
-    if ever_classic == 1:
-        if "MICs approach / post-Gavi" in regimes:
-            return "Classic → MIC (graduated)"
-        else:
-            return "Classic Gavi (always)"
-    else:
-        if ever_supported == 1:
-            return "Never → MIC (MICs entry)"
-        else:
-            return "Never Gavi (always)"
-
-trajectory_map = (
-    df.groupby("country_code")
-      .apply(classify_trajectory)
-      .reset_index()
-      .rename(columns={0: "gavi_trajectory"})
-)
+trajectory_order = {
+    "Classic Gavi (always)": 1,
+    "Classic → MIC (graduated)": 2,
+    "Never → MIC (MICs entry)": 3,
+    "Never Gavi (always)": 4,
+}
+
+# per-country features (one row per country_code)
+g = df.groupby("country_code")
+ever_classic = g["ever_classic_gavi"].first()
+ever_supported = g["ever_supported_by_gavi"].first()
+ever_mic = df["gavi_regime_it"].eq("MICs approach / post-Gavi").groupby(df["country_code"]).any()
+
+trajectory_map = pd.DataFrame({
+    "country_code": ever_classic.index,
+    "gavi_trajectory": pd.Categorical(np.select(
+        [
+            (ever_classic == 1) & ever_mic,
+            ever_classic == 1,
+            ever_supported == 1,
+        ],
+        [
+            "Classic → MIC (graduated)",
+            "Classic Gavi (always)",
+            "Never → MIC (MICs entry)",
+        ],
+        default="Never Gavi (always)",
+    ), categories=list(trajectory_order)),
+})
 
 
 # Merge back
@@ -80,21 +88,20 @@ df = df.merge(trajectory_map, on="country_code", how="left")
 # -----------------------------
 # Optional: numeric coding (useful for modeling)
 # -----------------------------
-trajectory_order = {
-    "Classic Gavi (always)": 1,
-    "Classic → MIC (graduated)": 2,
-    "Never → MIC (MICs entry)": 3,
-    "Never Gavi (always)": 4,
-}
-
-df["gavi_trajectory_code"] = df["gavi_trajectory"].map(trajectory_order)
+# plain lookup (Categorical.map would hand back a categorical of codes)
+df["gavi_trajectory_code"] = (
+    pd.Series(trajectory_order).reindex(df["gavi_trajectory"]).to_numpy()
+)
 
 # -----------------------------
 # Sanity checks
 # -----------------------------
+# one row per country, reused by all checks below
+country_level = df.drop_duplicates("country_code")
+
 print("\n=== Gavi policy trajectory: country counts ===")
 print(
-    df.drop_duplicates("country_code")["gavi_trajectory"]
+    country_level["gavi_trajectory"]
       .value_counts()
       .to_string()
 )
@@ -102,16 +109,16 @@ print(
 print("\n=== Cross-tab: trajectory × ever_classic_gavi ===")
 print(
     pd.crosstab(
-        df.drop_duplicates("country_code")["gavi_trajectory"],
-        df.drop_duplicates("country_code")["ever_classic_gavi"]
+        country_level["gavi_trajectory"],
+        country_level["ever_classic_gavi"]
     ).to_string()
 )
 
 print("\n=== Cross-tab: trajectory × ever_supported_by_gavi ===")
 print(
     pd.crosstab(
-        df.drop_duplicates("country_code")["gavi_trajectory"],
-        df.drop_duplicates("country_code")["ever_supported_by_gavi"]
+        country_level["gavi_trajectory"],
+        country_level["ever_supported_by_gavi"]
     ).to_string()
 )
 
@@ -123,5 +130,5 @@ if df["gavi_trajectory"].isna().any():
 # -----------------------------
 # Save
 # -----------------------------
-df.to_excel(OUT_XLSX, index=False, engine="openpyxl")
+save_df(df, OUT_XLSX)
 print(f"\nSaved: {OUT_XLSX}")
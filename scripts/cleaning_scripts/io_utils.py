@@ -0,0 +1,146 @@
+"""
+Shared table readers/writers for the cleaning scripts.
+
+- save_df writes the xlsx deliverable (xlsxwriter engine) and a Parquet
+  sidecar with the same stem, so downstream steps can skip xlsx parsing.
+  Frames with mixed-type columns (e.g. "N/A" fills), which Parquet cannot
+  store, get no sidecar (any stale one is removed); sidecar=False skips it
+  up front.
+- load_table reads that sidecar when it is at least as new as the xlsx,
+  otherwise it parses the workbook (calamine engine). Sidecar frames are
+  cast back to the dtypes an xlsx read gives (no category / Int64 / string
+  extension dtypes), so callers see the same frame from either source.
+- load_sheets / save_sheet do the same per sheet for a multi-sheet workbook
+  (dl_project_section_1): sidecars are named <stem>.<sheet>.parquet, hold
+  the whole sheet (usecols is applied after loading), are used only when
+  strictly newer than the xlsx, are written on the first calamine parse and
+  refreshed when save_sheet replaces a different sheet of the same workbook.
+- to_int64 casts a key column (e.g. year) to nullable Int64, skipping the
+  float round-trip when it already arrives as integers (Parquet inputs).
+"""
+
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def save_df(df: pd.DataFrame, xlsx_path, sheet_name: str = "Sheet1", sidecar: bool = True) -> None:
+    xlsx_path = Path(xlsx_path)
+    xlsx_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # NOTE: no constant_memory here -- pandas writes cells column by column,
+    # which constant_memory (row-streaming) would silently truncate
+    with pd.ExcelWriter(xlsx_path, engine="xlsxwriter") as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    # written after the xlsx so its mtime marks it as fresh for load_table
+    pq_path = xlsx_path.with_suffix(".parquet")
+    if sidecar:
+        try:
+            df.to_parquet(pq_path, index=False, compression="zstd")
+            return
+        except pa.ArrowException:
+            pass
+    # no sidecar for this write -> never leave an older one to shadow the xlsx
+    pq_path.unlink(missing_ok=True)
+
+
+def _xlsx_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    for i, dtype in enumerate(df.dtypes):
+        if not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            continue
+        s = df.iloc[:, i]
+        if isinstance(dtype, pd.CategoricalDtype):
+            # plain values of the categories (ints with NaN -> float, str -> object)
+            values = np.asarray(s)
+        elif dtype.kind in "iub" and not s.hasnans:
+            values = s.to_numpy(dtype=dtype.numpy_dtype)
+        elif dtype.kind in "iuf":
+            values = s.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            values = s.to_numpy(dtype=object, na_value=np.nan)
+        df.isetitem(i, values)
+    return df
+
+
+def load_table(xlsx_path, sheet_name=0) -> pd.DataFrame:
+    xlsx_path = Path(xlsx_path)
+    pq_path = xlsx_path.with_suffix(".parquet")
+
+    if pq_path.exists() and (
+        not xlsx_path.exists() or pq_path.stat().st_mtime >= xlsx_path.stat().st_mtime
+    ):
+        return _xlsx_dtypes(pd.read_parquet(pq_path))
+
+    return pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="calamine")
+
+
+def _sheet_sidecar(xlsx_path: Path, sheet_name: str) -> Path:
+    return xlsx_path.with_suffix(f".{sheet_name}.parquet")
+
+
+def _is_fresh(pq_path: Path, xlsx_path: Path) -> bool:
+    return pq_path.exists() and pq_path.stat().st_mtime > xlsx_path.stat().st_mtime
+
+
+def _select(df: pd.DataFrame, cols) -> pd.DataFrame:
+    if cols is None:
+        return df
+    if callable(cols):
+        return df[[c for c in df.columns if cols(c)]]
+    return df[list(cols)]
+
+
+def load_sheets(xlsx_path, sheet_names: list[str], usecols: dict | None = None) -> dict[str, pd.DataFrame]:
+    xlsx_path = Path(xlsx_path)
+    usecols = usecols or {}
+    frames = {}
+    stale = []
+    for sheet in sheet_names:
+        pq_path = _sheet_sidecar(xlsx_path, sheet)
+        if _is_fresh(pq_path, xlsx_path):
+            frames[sheet] = _xlsx_dtypes(pd.read_parquet(pq_path))
+        else:
+            stale.append(sheet)
+
+    # workbook is opened only if some sheet has no usable sidecar; the
+    # sidecar always holds the whole sheet so any usecols can be served
+    if stale:
+        with pd.ExcelFile(xlsx_path, engine="calamine") as xl:
+            for sheet in stale:
+                frames[sheet] = xl.parse(sheet)
+                try:
+                    frames[sheet].to_parquet(_sheet_sidecar(xlsx_path, sheet), index=False, compression="zstd")
+                except pa.ArrowException:
+                    _sheet_sidecar(xlsx_path, sheet).unlink(missing_ok=True)
+
+    return {sheet: _select(frames[sheet], usecols.get(sheet)) for sheet in sheet_names}
+
+
+def save_sheet(df: pd.DataFrame, xlsx_path, sheet_name: str) -> None:
+    xlsx_path = Path(xlsx_path)
+
+    # replacing one sheet leaves the others as they were, so their sidecars
+    # that were fresh before the write are still valid afterwards
+    keep_fresh = [
+        pq_path for pq_path in xlsx_path.parent.glob(f"{xlsx_path.stem}.*.parquet")
+        if pq_path != _sheet_sidecar(xlsx_path, sheet_name) and _is_fresh(pq_path, xlsx_path)
+    ]
+
+    with pd.ExcelWriter(xlsx_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    try:
+        df.to_parquet(_sheet_sidecar(xlsx_path, sheet_name), index=False, compression="zstd")
+    except pa.ArrowException:
+        _sheet_sidecar(xlsx_path, sheet_name).unlink(missing_ok=True)
+    for pq_path in keep_fresh:
+        os.utime(pq_path)
+
+
+def to_int64(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return s.astype("Int64", copy=False)
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
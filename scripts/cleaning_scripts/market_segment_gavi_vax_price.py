@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from io_utils import load_sheets, save_sheet
+
 INPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/02_cleaned_data/dl_project_section_1.xlsx"
 NEW_SHEET  = "gavi_mktseg_vaxprice_2024"
 
@@ -7,6 +10,9 @@ SHEET_VAX  = "hpv_vax_2024"
 SHEET_INC  = "income_class_2024"
 SHEET_GAVI = "gavi_country_2024"   # must have country_code, country_name, gavi_2024
 
+# list the offending rows in the duplicate checks (otherwise counts only)
+VERBOSE = False
+
 # -----------------------------
 # Reference lists
 # -----------------------------
@@ -45,6 +51,10 @@ PRICE_BY_SEGMENT = {
     # "NC": no price
 }
 
+# segment order = np.select precedence below; prices gathered by segment code
+SEGMENTS = ["MICs4", "MICs5", "MICs6", "gavi731", "Gavi73", "HIC", "MICs7", "NC"]
+SEGMENT_PRICES = np.array([PRICE_BY_SEGMENT.get(seg, np.nan) for seg in SEGMENTS], dtype="float64")
+
 # -----------------------------
 # Helpers
 # -----------------------------
@@ -59,42 +69,47 @@ ALIASES = {
     norm_name("Cabo Verde"): norm_name("Cape Verde"),
     norm_name("Micronesia (Federated States of)"): norm_name("Micronesia"),
 }
+# same mapping as a Series, so whole columns are looked up in one hash pass
+ALIASES_SER = pd.Series(ALIASES, dtype="string[pyarrow]")
+
+def norm_name_series(s: pd.Series) -> pd.Series:
+    """Column-wise norm_name + ALIASES lookup; missing names stay <NA>."""
+    n = s.astype("string[pyarrow]").str.strip().str.casefold()
+    return n.map(ALIASES_SER).fillna(n)
 
-def apply_alias(n: str) -> str:
-    return ALIASES.get(n, n)
+# reference lists go through the same normaliser as the data columns
+MICs4_set = frozenset(norm_name_series(pd.Series(MICs4)))
+MICs5_set = frozenset(norm_name_series(pd.Series(MICs5)))
+MICs6_set = frozenset(norm_name_series(pd.Series(MICs6)))
 
-def make_name_set(*cols) -> set:
-    s = set()
-    for c in cols:
-        # IMPORTANT FIX: don't use `if c:` with pd.NA
-        if pd.notna(c):
-            txt = str(c).strip()
-            if txt != "":
-                n = apply_alias(norm_name(txt))
-                if n:
-                    s.add(n)
-    return s
+
+def report_dup_codes(out: pd.DataFrame, sheet_label: str) -> None:
+    """Print the duplicate country_code check (rows listed only if VERBOSE)."""
+    dup_mask = out["country_code"].duplicated(keep=False)
+    print(f"\n=== Duplicate country_code check: {sheet_label} ===")
+    if not dup_mask.any():
+        print("No duplicates ✅")
+        return
+    print(f"Found {out.loc[dup_mask, 'country_code'].nunique()} duplicated country_code(s) ❌")
+    if VERBOSE:
+        print(out[dup_mask].sort_values("country_code").to_string(index=False))
 
 
 def prep_country_names(df: pd.DataFrame, name_col_new: str, sheet_label: str) -> pd.DataFrame:
     """Keep country_code + country_name, clean, and check duplicates."""
-    out = df[["country_code", "country_name"]].copy()
-    out["country_code"] = out["country_code"].astype("string").str.strip().str.upper()
-    out["country_name"] = out["country_name"].astype("string").str.strip()
+    # built straight from the cleaned columns (no select-then-copy)
+    out = pd.DataFrame({
+        "country_code": df["country_code"].astype("string[pyarrow]").str.strip().str.upper(),
+        "country_name": df["country_name"].astype("string[pyarrow]").str.strip(),
+    })
 
-    # Duplicate check
-    dup = out[out.duplicated(subset=["country_code"], keep=False)]
-    print(f"\n=== Duplicate country_code check: {sheet_label} ===")
-    if dup.empty:
-        print("No duplicates ✅")
-    else:
-        print(f"Found {dup['country_code'].nunique()} duplicated country_code(s) ❌")
-        print(dup.sort_values("country_code").to_string(index=False))
+    report_dup_codes(out, sheet_label)
 
-    out = out.dropna(subset=["country_code"])
-    out = out.drop_duplicates(subset=["country_code"], keep="first")
-    out = out.rename(columns={"country_name": name_col_new})
-    return out
+    return (
+        out.dropna(subset=["country_code"])
+        .drop_duplicates(subset=["country_code"], keep="first")
+        .rename(columns={"country_name": name_col_new})
+    )
 
 
 def prep_income_with_class(df: pd.DataFrame, sheet_label: str) -> pd.DataFrame:
@@ -119,41 +134,47 @@ def prep_income_with_class(df: pd.DataFrame, sheet_label: str) -> pd.DataFrame:
 
     income_col = possible[0]
 
-    out = df[["country_code", "country_name", income_col]].copy()
-    out["country_code"] = out["country_code"].astype("string").str.strip().str.upper()
-    out["country_name"] = out["country_name"].astype("string").str.strip()
-    out[income_col] = out[income_col].astype("string").str.strip().str.upper()
+    out = pd.DataFrame({
+        "country_code": df["country_code"].astype("string[pyarrow]").str.strip().str.upper(),
+        "country_name": df["country_name"].astype("string[pyarrow]").str.strip(),
+        income_col: df[income_col].astype("string[pyarrow]").str.strip().str.upper(),
+    })
 
-    # Duplicate check
-    dup = out[out.duplicated(subset=["country_code"], keep=False)]
-    print(f"\n=== Duplicate country_code check: {sheet_label} ===")
-    if dup.empty:
-        print("No duplicates ✅")
-    else:
-        print(f"Found {dup['country_code'].nunique()} duplicated country_code(s) ❌")
-        print(dup.sort_values("country_code").to_string(index=False))
+    report_dup_codes(out, sheet_label)
 
-    out = out.dropna(subset=["country_code"])
-    out = out.drop_duplicates(subset=["country_code"], keep="first")
-    out = out.rename(columns={"country_name": "country_name_inc", income_col: "income_class"})
-    return out
+    return (
+        out.dropna(subset=["country_code"])
+        .drop_duplicates(subset=["country_code"], keep="first")
+        .rename(columns={"country_name": "country_name_inc", income_col: "income_class"})
+    )
 
 
 # -----------------------------
 # Load sheets
 # -----------------------------
-vax  = pd.read_excel(INPUT_FILE, sheet_name=SHEET_VAX, engine="openpyxl")
-inc  = pd.read_excel(INPUT_FILE, sheet_name=SHEET_INC, engine="openpyxl")
-gavi = pd.read_excel(INPUT_FILE, sheet_name=SHEET_GAVI, engine="openpyxl")[["country_code", "country_name", "gavi_2024"]].copy()
+# one workbook open at most; sheets with a fresh Parquet sidecar skip it
+sheets = load_sheets(INPUT_FILE, [SHEET_VAX, SHEET_INC, SHEET_GAVI], usecols={
+    SHEET_VAX: ["country_code", "country_name"],
+    # income class column is resolved by name later; keep only its candidates
+    SHEET_INC: lambda c: c in {"country_code", "country_name"}
+    or ("income" in str(c).casefold() and "class" in str(c).casefold()),
+    SHEET_GAVI: ["country_code", "country_name", "gavi_2024"],
+})
+vax  = sheets[SHEET_VAX]
+inc  = sheets[SHEET_INC]
+gavi = sheets[SHEET_GAVI].copy()
 
 # Prepare
 vax2 = prep_country_names(vax, "country_name_vax", SHEET_VAX)
 inc2 = prep_income_with_class(inc, SHEET_INC)   # <-- now includes income_class
 
-gavi["country_code"] = gavi["country_code"].astype("string").str.strip().str.upper()
-gavi["country_name"] = gavi["country_name"].astype("string").str.strip()
-gavi = gavi.dropna(subset=["country_code"]).drop_duplicates(subset=["country_code"], keep="first")
-gavi = gavi.rename(columns={"country_name": "country_name_gavi"})
+gavi["country_code"] = gavi["country_code"].astype("string[pyarrow]").str.strip().str.upper()
+gavi["country_name"] = gavi["country_name"].astype("string[pyarrow]").str.strip()
+gavi = (
+    gavi.dropna(subset=["country_code"])
+    .drop_duplicates(subset=["country_code"], keep="first")
+    .rename(columns={"country_name": "country_name_gavi"})
+)
 
 # -----------------------------
 # Combine into one table (outer join on country_code)
@@ -174,13 +195,14 @@ combo = combo[[
 ]].copy()
 
 # Post-merge duplicate check (should never happen if keys were unique)
-dup_out = combo[combo.duplicated(subset=["country_code"], keep=False)]
+dup_mask = combo["country_code"].duplicated(keep=False)
 print("\n=== Duplicate country_code check: merged combo ===")
-if dup_out.empty:
+if not dup_mask.any():
     print("No duplicates after merge ✅")
 else:
     print("❌ Duplicate country_code found after merge!")
-    print(dup_out.sort_values("country_code").to_string(index=False))
+    if VERBOSE:
+        print(combo[dup_mask].sort_values("country_code").to_string(index=False))
 
 # -----------------------------
 # Assign market segment
@@ -194,43 +216,33 @@ else:
 #        - else -> NC
 #      (HIC and NC have no price)
 # -----------------------------
-MICs4_set = set(apply_alias(norm_name(x)) for x in MICs4)
-MICs5_set = set(apply_alias(norm_name(x)) for x in MICs5)
-MICs6_set = set(apply_alias(norm_name(x)) for x in MICs6)
-
-def assign_segment(row) -> str:
-    names = make_name_set(row["country_name_inc"], row["country_name_vax"], row["country_name_gavi"])
-
-    # 1) Name-based buckets
-    if names & MICs4_set:
-        return "MICs4"
-    if names & MICs5_set:
-        return "MICs5"
-    if names & MICs6_set:
-        return "MICs6"
-
-    # 2) Former gavi marker
-    gavi_val = row.get("gavi_2024")
-    if pd.notna(gavi_val) and str(gavi_val).strip().casefold() == "mic_former_gavi":
-        return "gavi731"
-
-    # 3) In GAVI list but not assigned -> Gavi73
-    if pd.notna(gavi_val):
-        return "Gavi73"
-
-    # 4) NOT in GAVI -> use income_class_2024 rules
-    inc_class = row.get("income_class")
-    inc_class = str(inc_class).strip().upper() if pd.notna(inc_class) else ""
-    
-    if inc_class == "H":
-        return "HIC"
-    elif inc_class in {"LM", "UM"}:
-        return "MICs7"
-    else:
-        return "NC"
-
-combo["vax_market_segment"] = combo.apply(assign_segment, axis=1)
-combo["vax_price_2024"] = combo["vax_market_segment"].map(PRICE_BY_SEGMENT)
+# the three source names stacked into one column -> normalised once, and
+# each MIC list is a single isin folded back to "any name matches" per row
+NAME_COLS = ["country_name_inc", "country_name_vax", "country_name_gavi"]
+names_long = norm_name_series(pd.concat([combo[c] for c in NAME_COLS], ignore_index=True))
+
+def in_any(name_set: frozenset) -> np.ndarray:
+    """True where any of the inc/vax/gavi names is in name_set."""
+    return names_long.isin(name_set).to_numpy(bool).reshape(len(NAME_COLS), -1).any(axis=0)
+
+gavi_norm = combo["gavi_2024"].astype("string[pyarrow]").str.strip().str.casefold()
+inc_u = combo["income_class"].astype("string[pyarrow]").str.strip().str.upper()
+
+# first matching condition wins (same order as the precedence above)
+segment_conds = [
+    in_any(MICs4_set),
+    in_any(MICs5_set),
+    in_any(MICs6_set),
+    gavi_norm.eq("mic_former_gavi").fillna(False).to_numpy(bool),
+    combo["gavi_2024"].notna().to_numpy(),
+    inc_u.eq("H").fillna(False).to_numpy(bool),
+    inc_u.isin(["LM", "UM"]).to_numpy(bool),
+]
+# select segment positions, then label and price by the same integer codes
+seg_codes = np.select(segment_conds, range(len(segment_conds)), default=len(SEGMENTS) - 1)
+combo["vax_market_segment"] = pd.Categorical.from_codes(seg_codes, categories=SEGMENTS)
+
+combo["vax_price_2024"] = SEGMENT_PRICES[seg_codes]
 
 # -----------------------------
 # Print checks
@@ -239,13 +251,18 @@ print("\n=== Segment counts ===")
 print(combo["vax_market_segment"].value_counts(dropna=False))
 
 print("\n=== Missing vax_price_2024 (expected for HIC/NC) ===")
-print(combo.loc[combo["vax_price_2024"].isna(), "vax_market_segment"].value_counts(dropna=False))
+print(
+    combo.loc[combo["vax_price_2024"].isna(), "vax_market_segment"]
+    .cat.remove_unused_categories()
+    .value_counts(dropna=False)
+)
 
 # -----------------------------
 # Write as NEW SHEET into existing workbook
 # -----------------------------
-with pd.ExcelWriter(INPUT_FILE, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-    combo.to_excel(writer, sheet_name=NEW_SHEET, index=False)
+# NOTE: save_sheet stays on openpyxl -- xlsxwriter cannot append to an
+# existing book, and its constant_memory mode would truncate pandas' writes
+save_sheet(combo, INPUT_FILE, NEW_SHEET)
 
 print(f"\n✅ Added/updated sheet '{NEW_SHEET}' in: {INPUT_FILE}")
 print("Rows written:", len(combo))
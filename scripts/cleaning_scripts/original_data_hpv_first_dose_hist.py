@@ -9,12 +9,14 @@ OUTPUT_FILE = r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/01_interm_d
 # --------------------------------------------------
 # Load
 # --------------------------------------------------
-df = pd.read_excel(INPUT_FILE, engine="openpyxl")
+required = ["CODE", "YEAR", "COVERAGE", "ANTIGEN"]
+
+# callable usecols: skip the other columns, but let missing ones reach the check below
+df = pd.read_excel(INPUT_FILE, usecols=lambda c: c in required, engine="calamine")
 
 # --------------------------------------------------
 # Required columns check
 # --------------------------------------------------
-required = ["CODE", "YEAR", "COVERAGE", "ANTIGEN"]
 missing = [c for c in required if c not in df.columns]
 if missing:
     raise ValueError(f"Missing required columns: {missing}")
@@ -42,8 +44,15 @@ df_out["ori_dat_antigen"] = df_out["ori_dat_antigen"].astype(str).str.strip()
 # --------------------------------------------------
 # DUPLICATE CHECKS
 # --------------------------------------------------
+# one grouping pass; all three stats below come from these group sizes
+# (dropna=False so missing keys count as equal, like duplicated() does)
+cya_sizes = df_out.groupby(
+    ["country_code", "year", "ori_dat_antigen"], dropna=False, sort=False
+).size()
+cy_sizes = cya_sizes.groupby(level=[0, 1], dropna=False, sort=False).sum()
+
 # 1) Multiple rows per country-year (often due to multiple antigens)
-dups_cy = df_out.duplicated(subset=["country_code", "year"]).sum()
+dups_cy = len(df_out) - len(cy_sizes)
 print("Duplicates on (country_code, year):", dups_cy)
 
 if dups_cy > 0:
@@ -53,7 +62,7 @@ if dups_cy > 0:
     print(dup_rows.head(50).to_string(index=False))
 
 # 2) Duplicate within same antigen for the same country-year (more serious)
-dups_cya = df_out.duplicated(subset=["country_code", "year", "ori_dat_antigen"]).sum()
+dups_cya = len(df_out) - len(cya_sizes)
 print("\nDuplicates on (country_code, year, ori_dat_antigen):", dups_cya)
 
 if dups_cya > 0:
@@ -63,7 +72,7 @@ if dups_cya > 0:
     print(dup_rows2.head(50).to_string(index=False))
 
 # Quick summary: how many antigens per country-year?
-antigens_per_cy = df_out.groupby(["country_code", "year"])["ori_dat_antigen"].nunique(dropna=True)
+antigens_per_cy = cya_sizes.groupby(level=[0, 1]).size().rename("ori_dat_antigen")
 print("\nAntigens per (country_code, year) summary:")
 print(antigens_per_cy.describe())
 
@@ -38,43 +38,37 @@ STOP_CODE = "ZWE"       # include row then stop
 # ==================================================
 # STEP 1: Create intermediate cleaned workbook (2015–2024)
 # ==================================================
-wb_in = load_workbook(RAW_INPUT_FILE, data_only=True)
+wb_in = load_workbook(RAW_INPUT_FILE, data_only=True, read_only=True)
 if SHEET_NAME not in wb_in.sheetnames:
     raise ValueError(f"Sheet '{SHEET_NAME}' not found. Available: {wb_in.sheetnames}")
 ws_in = wb_in[SHEET_NAME]
 
-wb_out = Workbook()
-ws_out = wb_out.active
-ws_out.title = "clean_2015_2024"
+# write-only: rows are appended whole and serialised as they go
+wb_out = Workbook(write_only=True)
+ws_out = wb_out.create_sheet("clean_2015_2024")
 
 # headers
-ws_out.cell(row=1, column=1).value = "country_code"
-ws_out.cell(row=1, column=2).value = "country_name"
-for i in range(N_YEARS):
-    ws_out.cell(row=1, column=3 + i).value = START_YEAR + i
+ws_out.append(["country_code", "country_name"] + [START_YEAR + i for i in range(N_YEARS)])
 
-out_row = 2
-
-for r in range(INPUT_START_ROW, ws_in.max_row + 1):
-    country_code = ws_in.cell(row=r, column=COL_COUNTRY_CODE).value
+# stream rows in order (random cell access would defeat read_only)
+for row in ws_in.iter_rows(
+    min_row=INPUT_START_ROW,
+    max_col=COL_YEAR_START + N_YEARS - 1,
+    values_only=True,
+):
+    country_code = row[COL_COUNTRY_CODE - 1]
 
     if country_code in (None, ""):
         continue
 
-    ws_out.cell(row=out_row, column=1).value = country_code
-    ws_out.cell(row=out_row, column=2).value = ws_in.cell(row=r, column=COL_COUNTRY_NAME).value
-
-    for i in range(N_YEARS):
-        ws_out.cell(row=out_row, column=3 + i).value = ws_in.cell(
-            row=r,
-            column=COL_YEAR_START + i
-        ).value
+    # raw values straight from the tuple, no per-cell objects
+    name = row[COL_COUNTRY_NAME - 1]
+    year_values = row[COL_YEAR_START - 1 : COL_YEAR_START - 1 + N_YEARS]
+    ws_out.append([country_code, name, *year_values])
 
     if country_code == STOP_CODE:
         break
 
-    out_row += 1
-
 wb_out.save(INTERM_OUTPUT_FILE)
 wb_in.close()
 
@@ -83,7 +77,7 @@ print("Saved intermediate cleaned file:", INTERM_OUTPUT_FILE)
 # ==================================================
 # STEP 2: Build income_class_2024 dataframe from intermediate file
 # ==================================================
-df = pd.read_excel(INTERM_OUTPUT_FILE, engine="openpyxl")
+df = pd.read_excel(INTERM_OUTPUT_FILE, engine="calamine")
 
 year_col = 2024 if 2024 in df.columns else "2024"
 if year_col not in df.columns:
@@ -97,13 +91,8 @@ df_out = df_out.rename(columns={year_col: "income_class"})
 # ==================================================
 # STEP 3: Append/replace the sheet in FINAL_BOOK
 # ==================================================
-wb = load_workbook(FINAL_BOOK)
-if FINAL_SHEET in wb.sheetnames:
-    wb.remove(wb[FINAL_SHEET])
-    wb.save(FINAL_BOOK)
-wb.close()
-
-with pd.ExcelWriter(FINAL_BOOK, engine="openpyxl", mode="a") as writer:
+# one load + one save of the workbook (replaces the sheet if it exists)
+with pd.ExcelWriter(FINAL_BOOK, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
     df_out.to_excel(writer, sheet_name=FINAL_SHEET, index=False)
 
 print("Saved sheet to existing workbook:")
@@ -2,9 +2,22 @@
 # Master runner for DL Pro country pipeline
 # ============================================================
 
+import io
+import os
 import sys
-import subprocess
+import runpy
+import warnings
+import traceback
 from pathlib import Path
+from collections import namedtuple
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, FIRST_EXCEPTION, wait
+
+PROJECT_DIR = Path(r"/Users/khaira_abdillah/Documents/dl_pro_country_comp")
+SCRIPT_DIR = PROJECT_DIR / "scripts" / "cleaning_scripts"
+
+# shared workbook that several steps read and rewrite in turn
+SECTION_1 = "02_cleaned_data/dl_project_section_1.xlsx"
 
 # ------------------------------------------------------------
 # Ordered pipeline (close to your original logic):
@@ -17,95 +30,216 @@ from pathlib import Path
 #   7) Add DTP (first/third dose) comparators
 #   8) Add cervical cancer context
 #   9) Final combine + pre-analysis cleaning
+#
+# Each entry is (script, reads, writes), paths relative to PROJECT_DIR.
+# The list order is the reference serial order; build_levels() turns the
+# file overlaps into dependencies so unrelated scripts run side by side.
 # ------------------------------------------------------------
 
-SCRIPTS = [
+PIPELINE = [
     # --------------------------------------------------
     # 1) Core WHO HPV vaccination coverage
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/clean_who_vax_cov_first_last_15f.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/original_data_hpv_first_dose_hist.py",
+    ("clean_who_vax_cov_first_last_15f.py",
+     ["00_raw_data/who_hpv_vax_first_15f.xlsx", "00_raw_data/who_hpv_vax_last_15f.xlsx"],
+     ["01_interm_data/who_hpv_vax_15f_first_last_clean.xlsx",
+      "01_interm_data/hpv_first_last_yearly_tests_2015_2024.xlsx", SECTION_1]),
+    ("original_data_hpv_first_dose_hist.py",
+     ["01_interm_data/coverage_cleaned.xlsx"],
+     ["01_interm_data/final_data_hpv_first_dose_hist.xlsx"]),
 
     # --------------------------------------------------
     # 2) World Bank income classifications
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/wb_income_class_cleaning.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/final_hist_income_countries.py",
+    ("wb_income_class_cleaning.py",
+     ["00_raw_data/wb_hist_income_country.xlsx", SECTION_1],
+     ["01_interm_data/wb_hist_income_2015_2024_clean.xlsx", SECTION_1]),
+    ("final_hist_income_countries.py",
+     ["00_raw_data/wb_hist_income_country.xlsx"],
+     ["01_interm_data/final_wb_hist_income.xlsx"]),
 
     # --------------------------------------------------
     # 3) Gavi eligibility & MIC approach
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/gavi_and_gavi_mic_country.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/final_hist_gavi_countries.py",
+    ("gavi_and_gavi_mic_country.py",
+     ["00_raw_data/gavi_eligibility_country.pdf", "00_raw_data/gavi_eligibility_country.xlsx",
+      "00_raw_data/gavi_mic_countries.xlsx", SECTION_1],
+     ["01_interm_data/gavi_eligibility_country.xlsx",
+      "01_interm_data/gavi_eligibility_country_wide.xlsx", SECTION_1]),
+    ("final_hist_gavi_countries.py",
+     ["01_interm_data/gavi_eligibility_country_wide.xlsx", SECTION_1],
+     ["01_interm_data/final_gavi_historical_data.xlsx"]),
 
     # --------------------------------------------------
     # 4) Vaccine pricing & market segments
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/market_segment_gavi_vax_price.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/final_market_segment_vax_pricing.py",
+    ("market_segment_gavi_vax_price.py",
+     [SECTION_1],
+     [SECTION_1]),
+    ("final_market_segment_vax_pricing.py",
+     ["01_interm_data/final_combined_part1_country.xlsx"],
+     ["01_interm_data/final_combined_part1_country_with_segment.xlsx"]),
 
     # --------------------------------------------------
     # 5) Combine historical country-year datasets
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/combine_part_1_historical_data_country.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/combine_part_2_hist_data_vax_cov.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/combine_part_3_hist_data_vax_info.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/combine_cleaned_data.py",
+    ("combine_part_1_historical_data_country.py",
+     ["01_interm_data/final_gavi_historical_data.xlsx", "01_interm_data/final_wb_hist_income.xlsx"],
+     ["01_interm_data/final_combined_part1_country.xlsx"]),
+    ("combine_part_2_hist_data_vax_cov.py",
+     ["01_interm_data/final_combined_part1_country_with_segment.xlsx",
+      "01_interm_data/coverage_cleaned.xlsx", "01_interm_data/final_data_hpv_first_dose_hist.xlsx"],
+     ["01_interm_data/final_combined_part2_country.xlsx"]),
+    ("combine_part_3_hist_data_vax_info.py",
+     ["01_interm_data/final_combined_part2_country.xlsx", "01_interm_data/vax_metadata.xlsx"],
+     ["02_cleaned_data/final_dataset_country_year.xlsx"]),
+    ("combine_cleaned_data.py",
+     [SECTION_1],
+     ["02_cleaned_data/dl_pro_final_dataset_country_analysis.xlsx"]),
 
     # --------------------------------------------------
     # 6) Vaccine program meta-data
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/clean_meta-data_vax.py",
+    ("clean_meta-data_vax.py",
+     ["01_interm_data/vax_metadata.csv"],
+     ["01_interm_data/vax_metadata.xlsx"]),
+
+    # --------------------------------------------------
+    # 7) DTP (first/third dose) comparators
+    # --------------------------------------------------
+    ("dtp_data_firstdose_official_who.py",
+     ["00_raw_data/Diphtheria tetanus toxoid and pertussis (DTP) vaccination coverage 1st dose 2026-15-01 12-07 UTC.xlsx"],
+     ["01_interm_data/dpt_vax_fd_2015_2024.xlsx"]),
+    ("dtp_data_thirddose_official_who.py",
+     ["00_raw_data/Diphtheria tetanus toxoid and pertussis (DTP) vaccination coverage 3rd dose 2026-15-01 12-07 UTC.xlsx"],
+     ["01_interm_data/dpt_vax_ld_2015_2024.xlsx"]),
 
     # --------------------------------------------------
-    # 7) Cervical cancer context (single-year)
+    # 8) Cervical cancer context (single-year)
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/final_cervical_cancer_2022_crude_rate.py",
+    ("final_cervical_cancer_2022_crude_rate.py",
+     ["02_cleaned_data/final_dataset_country_year.xlsx",
+      "01_interm_data/Datlit_HPV_Project_Final_Database - females-2022-cervix-uteri.tsv"],
+     ["02_cleaned_data/dl_pro_final_dataset_country_jan29.xlsx"]),
 
     # --------------------------------------------------
-    # 8) Final pre-analysis harmonisation
+    # 9) Final pre-analysis harmonisation
     # --------------------------------------------------
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/cleaning_pre_analysis_country.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/cleaning_for_analysis_2015_2024.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/gavi_regimes.py",
-    r"/Users/khaira_abdillah/Documents/dl_pro_country_comp/scripts/cleaning_scripts/gavi_regimes_2_trajectory.py",
+    ("cleaning_pre_analysis_country.py",
+     ["02_cleaned_data/dl_pro_final_dataset_country_jan29.xlsx"],
+     ["02_cleaned_data/dataset_country_analysis_final_30jan.xlsx"]),
+    ("cleaning_for_analysis_2015_2024.py",
+     ["02_cleaned_data/dataset_country_analysis_final_30jan.xlsx",
+      "01_interm_data/dpt_vax_fd_2015_2024.xlsx", "01_interm_data/dpt_vax_ld_2015_2024.xlsx"],
+     ["02_cleaned_data/dataset_country_analysis_final_30jan_clean_2015_2024.xlsx"]),
+    ("gavi_regimes.py",
+     ["02_cleaned_data/dataset_country_analysis_final_30jan_clean_2015_2024.xlsx"],
+     ["02_cleaned_data/dataset_country_analysis_with_gavi_regimes.xlsx"]),
+    ("gavi_regimes_2_trajectory.py",
+     ["02_cleaned_data/dataset_country_analysis_with_gavi_regimes.xlsx"],
+     ["02_cleaned_data/dataset_country_analysis_with_gavi_trajectory.xlsx"]),
 ]
 
 
 # ------------------------------------------------------------
-# Runner
+# Dependency levels
 # ------------------------------------------------------------
-def run_one(script_path: str) -> None:
-    p = Path(script_path)
-    if not p.exists():
-        raise FileNotFoundError(f"Script not found: {script_path}")
+def build_levels(pipeline: list) -> list[list[str]]:
+    """
+    A script depends on every earlier one that writes a file it reads or
+    writes, or reads a file it writes (so reruns see the same inputs as the
+    serial order). Level = 1 + deepest dependency; each level runs at once.
+    """
+    level_of = []
+    for j, (_, reads_j, writes_j) in enumerate(pipeline):
+        touched_j = set(reads_j) | set(writes_j)
+        level = 0
+        for i in range(j):
+            _, reads_i, writes_i = pipeline[i]
+            if set(writes_i) & touched_j or set(reads_i) & set(writes_j):
+                level = max(level, level_of[i] + 1)
+        level_of.append(level)
+
+    levels = [[] for _ in range(max(level_of) + 1)]
+    for (script, _, _), level in zip(pipeline, level_of):
+        levels[level].append(script)
+    return levels
 
-    print("\n" + "=" * 90)
-    print(f"RUNNING: {p.name}")
-    print(f"PATH   : {p}")
-    print("=" * 90)
 
-    result = subprocess.run(
-        [sys.executable, str(p)],
-        text=True,
-        capture_output=True,
-    )
-
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print(result.stderr)
-
-    if result.returncode != 0:
-        raise RuntimeError(f"❌ Script failed ({p.name}) with exit code {result.returncode}")
-
-    print(f"✅ DONE: {p.name}")
+# ------------------------------------------------------------
+# Runner
+# ------------------------------------------------------------
+ScriptResult = namedtuple("ScriptResult", ["returncode", "stdout", "stderr"])
+
+def run_script(p: Path) -> ScriptResult:
+    """
+    Run one script inside this worker's interpreter, so pandas/openpyxl are
+    imported once per worker instead of once per script. Exit code and
+    captured stdout/stderr are returned for the runner to print.
+    """
+    import pandas as pd
+
+    # `python script.py` puts the script folder first on sys.path (io_utils)
+    if str(p.parent) not in sys.path:
+        sys.path.insert(0, str(p.parent))
+
+    out, err = io.StringIO(), io.StringIO()
+    returncode = 0
+    try:
+        # scripts may flip pandas options (copy_on_write) or warning filters;
+        # both are restored so the next script in this worker starts clean
+        with pd.option_context("mode.copy_on_write", pd.get_option("mode.copy_on_write")), \
+                warnings.catch_warnings(), redirect_stdout(out), redirect_stderr(err):
+            runpy.run_path(str(p), run_name="__main__")
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            returncode = e.code or 0
+        else:
+            err.write(f"{e.code}\n")
+            returncode = 1
+    except Exception:
+        traceback.print_exc(file=err)
+        returncode = 1
+
+    return ScriptResult(returncode, out.getvalue(), err.getvalue())
+
+def run_level(scripts: list[str], pool: ProcessPoolExecutor) -> None:
+    paths = [SCRIPT_DIR / s for s in scripts]
+    for p in paths:
+        if not p.exists():
+            raise FileNotFoundError(f"Script not found: {p}")
+
+    futures = [pool.submit(run_script, p) for p in paths]
+    wait(futures, return_when=FIRST_EXCEPTION)
+
+    # report in listed order so the log reads the same as a serial run
+    for p, fut in zip(paths, futures):
+        result = fut.result()
+
+        print("\n" + "=" * 90)
+        print(f"RUNNING: {p.name}")
+        print(f"PATH   : {p}")
+        print("=" * 90)
+
+        if result.stdout:
+            print(result.stdout)
+        if result.stderr:
+            print(result.stderr)
+
+        if result.returncode != 0:
+            raise RuntimeError(f"❌ Script failed ({p.name}) with exit code {result.returncode}")
+
+        print(f"✅ DONE: {p.name}")
 
 def main():
     print("Starting full cleaning pipeline...\n")
-    for s in SCRIPTS:
-        run_one(s)
+    levels = build_levels(PIPELINE)
+    # scripts now run inside the workers, so there is no point in more than one per core
+    n_workers = min(os.cpu_count() or 1, max(map(len, levels)))
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        for scripts in levels:
+            run_level(scripts, pool)
     print("\n🎉 All cleaning scripts finished successfully.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()